@@ -1,142 +1,68 @@
+"""
+Дозаполнение professional_roles_name и area_name из карточек hh.ru.
+
+Обходит не всю коллекцию, а только кандидатов: точки с пустыми ролями или
+регионом (поля нет, null или пустая строка) и точки, обработанные старой
+версией обогатителей (enrich_version < ENRICH_SCHEMA_VERSION). Обработанной
+точке ставится текущая enrich_version, так что вакансия, для которой hh.ru
+ролей не вернул, при следующих запусках не запрашивается снова.
+"""
+import asyncio
 import os
-import re
-import time
 from datetime import datetime, timezone
-from typing import Optional, List, Any, Dict, Tuple
 
-import httpx
 from qdrant_client import QdrantClient
+from qdrant_client.models import FieldCondition, Filter, IsEmptyCondition, MatchValue, PayloadField, Range
+
+from enrichment import ENRICH_SCHEMA_VERSION, VERSION_FIELD, enrich, enrichers
+from scroll_checkpoint import get_checkpoint
 
 QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_COLLECTION = os.getenv("QDRANT_COLLECTION")
 
-SCROLL_LIMIT = int(os.getenv("QDRANT_SCROLL_LIMIT", "256"))
-UPDATE_BATCH = int(os.getenv("QDRANT_UPDATE_BATCH", "128"))
-SLEEP_SEC = float(os.getenv("HH_SLEEP_SEC", "0.35"))
-
-HH_API = "https://api.hh.ru/vacancies/{}"
-HH_ID_RE = re.compile(r"/vacancy/(\d+)", re.IGNORECASE)
-
-
-def extract_hh_id(url: str) -> Optional[str]:
-    if not url:
-        return None
-    m = HH_ID_RE.search(url)
-    return m.group(1) if m else None
-
-
-def fetch_meta(hc: httpx.Client, hh_id: str) -> Tuple[Optional[List[str]], Optional[str]]:
-    """
-    returns (roles_names, area_name)
-    """
-    r = hc.get(HH_API.format(hh_id))
-    if r.status_code == 404:
-        return None, None
-
-    r.raise_for_status()
-    data = r.json()
+# ежедневно роли и регион у перепроверяемых точек обновляет валидатор
+ENRICHERS = os.getenv("BACKFILL_ENRICHERS", "roles,area,version")
+BACKFILL_FIELDS = ["professional_roles_name", "area_name"]
 
-    roles = data.get("professional_roles") or []
-    role_names = []
-    for rr in roles:
-        name = (rr or {}).get("name")
-        if name:
-            role_names.append(str(name).strip())
 
-    seen = set()
-    uniq_roles = []
-    for n in role_names:
-        if n not in seen:
-            seen.add(n)
-            uniq_roles.append(n)
-
-    area_name = None
-    area = data.get("area")
-    if isinstance(area, dict):
-        area_name = area.get("name")
-
-    return (uniq_roles or None), area_name
-
-
-def flush_payload(q: QdrantClient, ids: List[Any], payload: Dict):
-    for i in range(0, len(ids), UPDATE_BATCH):
-        q.set_payload(
-            collection_name=QDRANT_COLLECTION,
-            payload=payload,
-            points=ids[i:i + UPDATE_BATCH],
-        )
+def candidates_filter() -> Filter:
+    missing = []
+    for key in BACKFILL_FIELDS:
+        # is_empty — поля нет, null или []; пустую строку он не ловит
+        missing.append(IsEmptyCondition(is_empty=PayloadField(key=key)))
+        missing.append(FieldCondition(key=key, match=MatchValue(value="")))
+    stale = FieldCondition(key=VERSION_FIELD, range=Range(lt=ENRICH_SCHEMA_VERSION))
+    done = FieldCondition(key=VERSION_FIELD, range=Range(gte=ENRICH_SCHEMA_VERSION))
+    return Filter(should=missing + [stale], must_not=[done])
 
 
 def main():
     q = QdrantClient(url=QDRANT_URL, prefer_grpc=False)
 
-    offset = None
-    points_seen = 0
-    checked = 0
-    updated = 0
-    skipped_no_hh = 0
-    skipped_http = 0
-
-    with httpx.Client(timeout=20, headers={"User-Agent": "JobRadar-AI backfill"}) as hc:
-        while True:
-            points, offset = q.scroll(
-                collection_name=QDRANT_COLLECTION,
-                limit=SCROLL_LIMIT,
-                offset=offset,
-                with_payload=True,
-                with_vectors=False,
-            )
-
-            if not points:
-                break
-
-            points_seen += len(points)
-
-            groups: Dict[Tuple[str, str], List[Any]] = {}
-
-            for pt in points:
-                p = pt.payload or {}
-                url = (p.get("url") or p.get("alternate_url") or "").strip()
-
-                hh_id = extract_hh_id(url)
-                if not hh_id:
-                    skipped_no_hh += 1
-                    continue
-
-                try:
-                    roles, area_name = fetch_meta(hc, hh_id)
-                    checked += 1
-                except Exception:
-                    skipped_http += 1
-                    continue
-
-                time.sleep(SLEEP_SEC)
-
-                if not roles and not area_name:
-                    continue
-
-                roles_str = ", ".join(roles) if roles else ""
-                area_str = area_name or ""
-
-                key = (roles_str, area_str)
-                groups.setdefault(key, []).append(pt.id)
-
-            for (roles_str, area_str), ids in groups.items():
-                payload = {
-                    "professional_roles_name": roles_str,
-                    "area_name": area_str,
-                }
-
-                flush_payload(q, ids, payload)
-                updated += len(ids)
-
-            if offset is None:
-                break
-
-    print(
-        f"points_seen={points_seen} checked_hh={checked} "
-        f"updated={updated} skipped_no_hh={skipped_no_hh} skipped_http={skipped_http}"
+    plan = [("candidates", candidates_filter())]
+    checkpoint = get_checkpoint(f"backfill-{QDRANT_COLLECTION}")
+    resume = checkpoint.load([name for name, _ in plan]) if checkpoint else None
+    if resume:
+        print(f"Продолжаю прогон от {resume['now']}: {resume['stats']['points_seen']} точек уже пройдено")
+    now = resume["now"] if resume else datetime.now(timezone.utc).isoformat()
+
+    # уже обработанные точки из кандидатов выпадают, поэтому при продолжении число — остаток
+    candidates = q.count(collection_name=QDRANT_COLLECTION, count_filter=plan[0][1], exact=True).count
+    print(f"candidates: {candidates} (enrich_version < {ENRICH_SCHEMA_VERSION} или пустые {', '.join(BACKFILL_FIELDS)})")
+    if not candidates:
+        if checkpoint is not None:
+            checkpoint.clear()
+        return
+
+    stats = asyncio.run(
+        enrich(
+            q, QDRANT_COLLECTION, enrichers(ENRICHERS), plan, now,
+            user_agent="JobRadar-AI backfill", checkpoint=checkpoint, resume=resume, total=candidates,
+        )
     )
+    print(stats)
+    left = q.count(collection_name=QDRANT_COLLECTION, count_filter=plan[0][1], exact=True).count
+    print(f"done: {candidates - left}/{candidates} candidates, left={left}")
 
 
 if __name__ == "__main__":
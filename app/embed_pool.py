@@ -0,0 +1,147 @@
+"""
+Пул процессов для кодирования на CPU: N воркеров × M потоков torch.
+
+Один SentenceTransformer с потоками torch по умолчанию плохо масштабируется
+на многоядерных воркерах Airflow: на небольших батчах intra-op параллелизм
+упирается в синхронизацию. Пул запускает EMBED_WORKERS процессов, каждый
+загружает модель один раз и работает в EMBED_TORCH_THREADS потоков, а тексты
+раздаются шардами, отсортированными по длине. Лучшее сочетание для машины
+подбирает bench/bench_embed_pool.py.
+
+EMBED_PRECISION=int8 включает динамическую int8-квантизацию линейных слоёв
+(и в пуле, и в текущем процессе); расхождение с fp32 проверяет
+bench/bench_quantized.py.
+"""
+import math
+import multiprocessing as mp
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from embedder import encode_dynamic
+
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "1"))
+# 0 — поровну делим ядра между воркерами
+EMBED_TORCH_THREADS = int(os.getenv("EMBED_TORCH_THREADS", "0"))
+EMBED_POOL_MIN_SHARD = int(os.getenv("EMBED_POOL_MIN_SHARD", "64"))
+# int8 — динамическая квантизация nn.Linear трансформера (torch.quantization.quantize_dynamic)
+EMBED_PRECISION = os.getenv("EMBED_PRECISION", "fp32").lower()
+
+
+def torch_threads(workers: int, threads: int = EMBED_TORCH_THREADS) -> int:
+    return threads if threads > 0 else max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def configure_torch_threads(threads: int) -> None:
+    import torch
+
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # interop-потоки можно задать только до первого параллельного вызова
+        pass
+
+
+def encoder_name(model_name: str, precision: str = EMBED_PRECISION) -> str:
+    """Имя модели с учётом точности: векторы int8 и fp32 не должны смешиваться в кешах и хешах."""
+    return model_name if precision == "fp32" else f"{model_name}@{precision}"
+
+
+def load_model(model_name: str, precision: str = EMBED_PRECISION):
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+    if precision == "int8":
+        import torch
+
+        model.eval()
+        torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    elif precision != "fp32":
+        raise ValueError(f"EMBED_PRECISION={precision!r}: поддерживаются fp32 и int8")
+    return model
+
+
+_MODEL = None
+
+
+def _init_worker(model_name: str, threads: int, precision: str) -> None:
+    global _MODEL
+    configure_torch_threads(threads)
+    _MODEL = load_model(model_name, precision)
+
+
+def _encode_shard(shard: Tuple[np.ndarray, List[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    idx, texts = shard
+    return idx, encode_dynamic(_MODEL, texts)
+
+
+def _dimension(_=None) -> int:
+    return _MODEL.get_sentence_embedding_dimension()
+
+
+class EmbeddingPool:
+    """
+    Заменяет SentenceTransformer там, где тексты кодируются через
+    embedder.encode_texts(): encode_texts() раздаёт шарды по процессам.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        workers: int = EMBED_WORKERS,
+        threads: int = EMBED_TORCH_THREADS,
+        precision: str = EMBED_PRECISION,
+    ):
+        self.model_name = model_name
+        self.workers = max(1, workers)
+        self.threads = torch_threads(self.workers, threads)
+        # fork после импорта torch небезопасен, поэтому spawn
+        ctx = mp.get_context("spawn")
+        self._pool = ctx.Pool(
+            self.workers, initializer=_init_worker, initargs=(model_name, self.threads, precision)
+        )
+        self._dim: Optional[int] = None
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self._dim is None:
+            self._dim = self._pool.apply(_dimension)
+        return self._dim
+
+    def encode_texts(self, texts: Sequence[str]) -> np.ndarray:
+        texts = ["" if t is None else str(t) for t in texts]
+        out = np.empty((len(texts), self.get_sentence_embedding_dimension()), dtype=np.float32)
+        if not texts:
+            return out
+        # шарды одинаковой длины текстов; их больше, чем воркеров, чтобы свободный воркер брал следующий
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        size = max(EMBED_POOL_MIN_SHARD, math.ceil(len(texts) / (self.workers * 4)))
+        shards = [(order[a:a + size], [texts[i] for i in order[a:a + size]]) for a in range(0, len(texts), size)]
+        for idx, vecs in self._pool.imap_unordered(_encode_shard, shards):
+            out[idx] = vecs
+        return out
+
+    def close(self) -> None:
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self) -> "EmbeddingPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def load_encoder(
+    model_name: str,
+    workers: int = EMBED_WORKERS,
+    threads: int = EMBED_TORCH_THREADS,
+    precision: str = EMBED_PRECISION,
+):
+    """SentenceTransformer в текущем процессе при workers <= 1, иначе EmbeddingPool."""
+    if workers > 1:
+        return EmbeddingPool(model_name, workers, threads, precision)
+    if threads > 0:
+        configure_torch_threads(threads)
+    return load_model(model_name, precision)
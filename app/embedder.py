@@ -0,0 +1,98 @@
+"""
+Кодирование текстов SentenceTransformer динамическими батчами.
+
+Тексты сортируются по длине в токенах и упаковываются в батчи по бюджету
+токенов (длина самого длинного текста в батче * размер батча), а не по
+фиксированному числу документов: короткие вакансии идут большими батчами,
+длинные — маленькими, и на паддинг почти не тратится время. Перед
+токенизацией текст обрезается по символам, чтобы не токенизировать
+описания, которые модель всё равно обрежет до max_seq_length.
+"""
+import os
+from typing import Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+EMBED_TOKEN_BUDGET = int(os.getenv("EMBED_TOKEN_BUDGET", "16384"))
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "256"))
+# с запасом: на русском тексте у wordpiece/sentencepiece выходит ~3-5 символов на токен
+EMBED_CHARS_PER_TOKEN = int(os.getenv("EMBED_CHARS_PER_TOKEN", "8"))
+
+
+def max_seq_length(model) -> int:
+    return int(getattr(model, "max_seq_length", None) or 512)
+
+
+def clip_texts(model, texts: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+    """
+    Обрезает тексты по символам до того, что модель всё равно увидит, и считает
+    их длины в токенах (со служебными, не больше max_seq_length модели).
+    """
+    limit = max_seq_length(model)
+    cut = limit * EMBED_CHARS_PER_TOKEN
+    clipped = [t[:cut] for t in texts]
+    enc = model.tokenizer(clipped, add_special_tokens=True, truncation=True, max_length=limit)
+    lengths = np.fromiter((len(ids) for ids in enc["input_ids"]), dtype=np.int64, count=len(texts))
+
+    # обрезанный текст дал меньше limit токенов — символов на токен оказалось больше,
+    # чем заложено; такие тексты оставляем целиком, чтобы вектор не изменился
+    short = [i for i, t in enumerate(texts) if len(t) > cut and lengths[i] < limit]
+    if short:
+        enc = model.tokenizer([texts[i] for i in short], add_special_tokens=True, truncation=True, max_length=limit)
+        for i, ids in zip(short, enc["input_ids"]):
+            clipped[i] = texts[i]
+            lengths[i] = len(ids)
+    return clipped, lengths
+
+
+def token_batches(
+    lengths: np.ndarray, token_budget: int = EMBED_TOKEN_BUDGET, max_batch: int = EMBED_MAX_BATCH
+) -> Iterator[np.ndarray]:
+    """
+    Индексы текстов, сгруппированные в батчи: от длинных к коротким,
+    пока len(batch) * max(len) укладывается в token_budget.
+    """
+    order = np.argsort(-lengths, kind="stable")
+    start = 0
+    while start < len(order):
+        # тексты отсортированы по убыванию, поэтому самый длинный в батче — первый
+        longest = max(int(lengths[order[start]]), 1)
+        size = max(1, min(max_batch, token_budget // longest))
+        yield order[start:start + size]
+        start += size
+
+
+def encode_dynamic(
+    model,
+    texts: Sequence[str],
+    token_budget: int = EMBED_TOKEN_BUDGET,
+    max_batch: int = EMBED_MAX_BATCH,
+    normalize: bool = True,
+) -> np.ndarray:
+    """
+    model.encode() динамическими батчами; строки результата идут в исходном порядке texts.
+    """
+    texts: List[str] = ["" if t is None else str(t) for t in texts]
+    dim = model.get_sentence_embedding_dimension()
+    out = np.empty((len(texts), dim), dtype=np.float32)
+    if not texts:
+        return out
+
+    clipped, lengths = clip_texts(model, texts)
+    for idx in token_batches(lengths, token_budget, max_batch):
+        batch = [clipped[i] for i in idx]
+        out[idx] = model.encode(
+            batch,
+            batch_size=len(batch),
+            show_progress_bar=False,
+            normalize_embeddings=normalize,
+            convert_to_numpy=True,
+        )
+    return out
+
+
+def encode_texts(model, texts: Sequence[str]) -> np.ndarray:
+    """SentenceTransformer кодируется здесь, у пула процессов (embed_pool.EmbeddingPool) своя раздача батчей."""
+    if hasattr(model, "encode_texts"):
+        return model.encode_texts(texts)
+    return encode_dynamic(model, texts)
@@ -0,0 +1,240 @@
+"""
+Дисковый кеш эмбеддингов по (модель, хеш текста).
+
+Векторы лежат в memory-mapped файле vectors.f32 фиксированной ёмкости
+(EMBED_CACHE_MAX_MB), индекс hash -> строка файла — в SQLite рядом.
+Для каждой модели своя папка, поэтому смена EMBED_MODEL не подмешивает
+чужие векторы. При заполнении вытесняются давно не читанные строки (LRU),
+их слоты переиспользуются. Кешируются только нормированные векторы.
+
+Кешем одновременно пользуются бот и загрузчик, поэтому раздача слотов
+(следующий свободный и список освободившихся) хранится в том же SQLite,
+а чтение и запись идут под flock на файле lock: запись — эксклюзивно,
+чтение — совместно, чтобы слот не перезаписали посреди чтения вектора.
+"""
+import fcntl
+import hashlib
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from embedder import encode_texts
+
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", os.path.join(tempfile.gettempdir(), "jobradar", "embed_cache"))
+EMBED_CACHE_MAX_MB = float(os.getenv("EMBED_CACHE_MAX_MB", "1024"))
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "1").lower() in ("1", "true", "yes")
+
+
+def text_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _model_dir(root: str, model_name: str, dim: int) -> str:
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "_", model_name.strip("/")) or "model"
+    digest = hashlib.md5(model_name.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(root, f"{slug}-{digest}-{dim}")
+
+
+class EmbeddingCache:
+    def __init__(self, model_name: str, dim: int, root: str = EMBED_CACHE_DIR, max_mb: float = EMBED_CACHE_MAX_MB):
+        self.model_name = model_name
+        self.dim = dim
+        self.path = _model_dir(root, model_name, dim)
+        os.makedirs(self.path, exist_ok=True)
+        self.capacity = max(1, int(max_mb * 1024 * 1024) // (dim * 4))
+
+        vectors_path = os.path.join(self.path, "vectors.f32")
+        size = self.capacity * dim * 4
+        with open(vectors_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(self.capacity, dim))
+
+        # flock общий на процесс (один файловый дескриптор), между потоками — self._lock
+        self._lock = threading.Lock()
+        self._lock_file = open(os.path.join(self.path, "lock"), "a+")
+        self._db = sqlite3.connect(os.path.join(self.path, "index.sqlite"), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._locked(shared=False):
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS vectors (hash TEXT PRIMARY KEY, slot INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS vectors_accessed_at ON vectors(accessed_at)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS free_slots (slot INTEGER PRIMARY KEY)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            # ёмкость могла уменьшиться с прошлого запуска
+            self._db.execute("DELETE FROM vectors WHERE slot >= ?", (self.capacity,))
+            self._db.execute("DELETE FROM free_slots WHERE slot >= ?", (self.capacity,))
+            if self._next_slot() is None:
+                # кеш из прошлой версии без таблиц раздачи слотов
+                used = {slot for (slot,) in self._db.execute("SELECT slot FROM vectors")}
+                next_slot = max(used) + 1 if used else 0
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO free_slots VALUES (?)", [(s,) for s in range(next_slot) if s not in used]
+                )
+                self._set_next_slot(next_slot)
+            elif self._next_slot() > self.capacity:
+                self._set_next_slot(self.capacity)
+
+    @contextmanager
+    def _locked(self, shared: bool) -> Iterator[None]:
+        with self._lock:
+            fcntl.flock(self._lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _next_slot(self) -> Optional[int]:
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'next_slot'").fetchone()
+        return row[0] if row else None
+
+    def _set_next_slot(self, value: int) -> None:
+        self._db.execute("INSERT OR REPLACE INTO meta VALUES ('next_slot', ?)", (value,))
+
+    def get_many(self, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        if not hashes:
+            return found
+        with self._locked(shared=True):
+            rows = []
+            unique = list(dict.fromkeys(hashes))
+            # ограничение SQLite на число параметров в запросе
+            for i in range(0, len(unique), 900):
+                part = unique[i:i + 900]
+                marks = ",".join("?" * len(part))
+                rows += self._db.execute(
+                    f"SELECT hash, slot FROM vectors WHERE hash IN ({marks}) AND slot < ?", part + [self.capacity]
+                ).fetchall()
+            if rows:
+                now = time.time()
+                self._db.executemany("UPDATE vectors SET accessed_at = ? WHERE hash = ?", [(now, h) for h, _ in rows])
+            for h, slot in rows:
+                found[h] = np.array(self._vectors[slot])
+        return found
+
+    def put_many(self, hashes: Sequence[str], vectors: np.ndarray) -> None:
+        if not len(hashes):
+            return
+        with self._locked(shared=False):
+            new = self._missing(hashes, vectors)
+            if not new:
+                return
+            # вытеснение фиксируется до записи векторов: иначе после падения до COMMIT откат
+            # вернул бы строку индекса на слот, в котором уже лежит вектор другого текста
+            self._transaction(self._reserve, len(new))
+            self._transaction(self._put_locked, new)
+
+    def _transaction(self, fn, *args) -> None:
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            fn(*args)
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def _missing(self, hashes: Sequence[str], vectors: np.ndarray) -> List[Tuple[str, np.ndarray]]:
+        existing = set()
+        for i in range(0, len(hashes), 900):
+            part = list(hashes[i:i + 900])
+            marks = ",".join("?" * len(part))
+            existing.update(h for (h,) in self._db.execute(f"SELECT hash FROM vectors WHERE hash IN ({marks})", part))
+        new = [(h, v) for h, v in zip(hashes, vectors) if h not in existing]
+        return list({h: v for h, v in new}.items())[: self.capacity]
+
+    def _reserve(self, n: int) -> None:
+        """Вытесняет строки, если свободных и ещё не занятых слотов меньше n."""
+        free = self._db.execute("SELECT COUNT(*) FROM free_slots").fetchone()[0]
+        free += self.capacity - (self._next_slot() or 0)
+        if free < n:
+            self._evict(n - free)
+
+    def _put_locked(self, new: List[Tuple[str, np.ndarray]]) -> None:
+        slots = self._allocate(len(new))
+        for slot, (_, vec) in zip(slots, new):
+            self._vectors[slot] = vec
+        # пишем только в свободные слоты, сначала векторы на диск, потом индекс:
+        # после падения до COMMIT слоты остаются свободными, а индекс не ссылается на них
+        self._vectors.flush()
+        now = time.time()
+        self._db.executemany(
+            "INSERT OR REPLACE INTO vectors VALUES (?, ?, ?)", [(h, slot, now) for slot, (h, _) in zip(slots, new)]
+        )
+
+    def _allocate(self, n: int) -> List[int]:
+        # состояние слотов читаем из SQLite под блокировкой: его мог поменять другой процесс;
+        # нужное число свободных слотов заранее обеспечивает _reserve
+        slots = [slot for (slot,) in self._db.execute("SELECT slot FROM free_slots LIMIT ?", (n,))]
+        self._db.executemany("DELETE FROM free_slots WHERE slot = ?", [(s,) for s in slots])
+        next_slot = self._next_slot() or 0
+        take = min(n - len(slots), self.capacity - next_slot)
+        slots.extend(range(next_slot, next_slot + take))
+        self._set_next_slot(next_slot + take)
+        return slots
+
+    def _evict(self, n: int) -> None:
+        # освобождаем с запасом (10% ёмкости), чтобы не вытеснять на каждый put
+        count = max(n, self.capacity // 10)
+        rows = self._db.execute("SELECT hash, slot FROM vectors ORDER BY accessed_at LIMIT ?", (count,)).fetchall()
+        self._db.executemany("DELETE FROM vectors WHERE hash = ?", [(h,) for h, _ in rows])
+        self._db.executemany("INSERT OR IGNORE INTO free_slots VALUES (?)", [(slot,) for _, slot in rows])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._vectors.flush()
+            self._db.close()
+            self._lock_file.close()
+
+
+_CACHES: Dict[Tuple[str, int], EmbeddingCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_embedding_cache(model_name: str, dim: int) -> Optional[EmbeddingCache]:
+    """Общий кеш на процесс для модели; None, если кеш выключен через EMBED_CACHE_ENABLED=0."""
+    if not EMBED_CACHE_ENABLED or not model_name:
+        return None
+    with _CACHES_LOCK:
+        key = (model_name, dim)
+        if key not in _CACHES:
+            _CACHES[key] = EmbeddingCache(model_name, dim)
+        return _CACHES[key]
+
+
+def encode_cached(model, texts: Sequence[str], cache: Optional[EmbeddingCache]) -> np.ndarray:
+    """
+    encode_texts() с кешем: кодируются только тексты, которых нет в кеше
+    (и каждый уникальный текст один раз); порядок строк как у texts.
+    """
+    texts = ["" if t is None else str(t) for t in texts]
+    if cache is None:
+        return encode_texts(model, texts)
+
+    hashes = [text_hash(t) for t in texts]
+    found = cache.get_many(hashes)
+    missing: Dict[str, str] = {}
+    for h, t in zip(hashes, texts):
+        if h not in found:
+            missing.setdefault(h, t)
+    if missing:
+        vecs = encode_texts(model, list(missing.values()))
+        cache.put_many(list(missing), vecs)
+        found.update(zip(missing, vecs))
+
+    out = np.empty((len(texts), cache.dim), dtype=np.float32)
+    for i, h in enumerate(hashes):
+        out[i] = found[h]
+    return out
@@ -0,0 +1,355 @@
+"""
+Обогащение точек коллекции вакансий данными из карточки hh.ru за один проход.
+
+Раньше валидатор и бэкфилл каждый обходили всю коллекцию и запрашивали одну и
+ту же /vacancies/{id}. Здесь коллекция обходится один раз, карточка каждой
+вакансии запрашивается один раз, а набор обогатителей (ENRICHERS) раскладывает
+её по полям payload: статус архива, роли, регион, навыки, зарплата.
+Одинаковые обновления группируются и пишутся пачками через batch_update_points.
+
+Обогатитель — функция (status, data, now) -> поля для set_payload; пустой
+словарь — ничего не менять (например, роли у удалённой вакансии).
+Обогатитель "version" ставит точке enrich_version: точка с текущей версией
+уже обработана, даже если у hh.ru для неё ничего не нашлось, и бэкфилл её
+пропускает. Версию надо поднять, если изменился формат полей обогатителей.
+"""
+import asyncio
+import json
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from qdrant_client import QdrantClient
+from qdrant_client.models import Filter, SetPayload, SetPayloadOperation
+from tqdm import tqdm
+
+from hh_client import afetch_vacancy, extract_hh_id
+from payload_projection import projection
+from scroll_checkpoint import ScrollCheckpoint
+
+SCROLL_LIMIT = int(os.getenv("QDRANT_SCROLL_LIMIT", "256"))
+UPDATE_BATCH = int(os.getenv("QDRANT_UPDATE_BATCH", "128"))
+# одновременных запросов карточек; общий потолок частоты — HH_RATE_MAX_RPS в rate_limiter
+CONCURRENCY = int(os.getenv("ENRICH_CONCURRENCY", os.getenv("VALIDATOR_CONCURRENCY", "16")))
+
+VERSION_FIELD = "enrich_version"
+ENRICH_SCHEMA_VERSION = 1
+
+Enricher = Callable[[int, Optional[Dict[str, Any]], str], Dict[str, Any]]
+
+
+def enrich_archive(status: int, data: Optional[Dict[str, Any]], now: str) -> Dict[str, Any]:
+    """Неактивна, если 404 или archived=true."""
+    inactive = status == 404 or bool((data or {}).get("archived", False))
+    return {"is_active": not inactive, "archived": inactive, "archived_checked_at": now}
+
+
+def enrich_roles(status: int, data: Optional[Dict[str, Any]], now: str) -> Dict[str, Any]:
+    names = [str(r.get("name")).strip() for r in (data or {}).get("professional_roles") or [] if r and r.get("name")]
+    names = list(dict.fromkeys(names))
+    return {"professional_roles_name": ", ".join(names)} if names else {}
+
+
+def enrich_area(status: int, data: Optional[Dict[str, Any]], now: str) -> Dict[str, Any]:
+    area = (data or {}).get("area")
+    name = area.get("name") if isinstance(area, dict) else None
+    return {"area_name": name} if name else {}
+
+
+def enrich_skills(status: int, data: Optional[Dict[str, Any]], now: str) -> Dict[str, Any]:
+    if not data:
+        return {}
+    skills = [s["name"] for s in data.get("key_skills") or [] if s and s.get("name")]
+    return {"key_skills": ", ".join(skills)}
+
+
+def enrich_salary(status: int, data: Optional[Dict[str, Any]], now: str) -> Dict[str, Any]:
+    if not data:
+        return {}
+    salary = data.get("salary")
+    if not isinstance(salary, dict):
+        return {"salary_text": ""}
+    parts = []
+    if salary.get("from"):
+        parts.append(f"от {salary['from']}")
+    if salary.get("to"):
+        parts.append(f"до {salary['to']}")
+    if parts and salary.get("currency"):
+        parts.append(salary["currency"])
+    return {"salary_text": " ".join(parts)}
+
+
+def enrich_version(status: int, data: Optional[Dict[str, Any]], now: str) -> Dict[str, Any]:
+    return {VERSION_FIELD: ENRICH_SCHEMA_VERSION}
+
+
+ENRICHERS: Dict[str, Enricher] = {
+    "archive": enrich_archive,
+    "roles": enrich_roles,
+    "area": enrich_area,
+    "skills": enrich_skills,
+    "salary": enrich_salary,
+    "version": enrich_version,
+}
+
+
+def enrichers(names: str) -> Dict[str, Enricher]:
+    """Обогатители по списку имён через запятую, например "archive,roles,area"."""
+    selected = {}
+    for name in (n.strip() for n in names.split(",")):
+        if not name:
+            continue
+        if name not in ENRICHERS:
+            raise ValueError(f"Неизвестный обогатитель: {name!r}")
+        selected[name] = ENRICHERS[name]
+    return selected
+
+
+def flush_payload(q: QdrantClient, collection: str, groups: Dict[str, List[Any]]) -> None:
+    """Пишет сгруппированные обновления (JSON payload -> ID точек) одним запросом на UPDATE_BATCH точек."""
+    ops: List[SetPayloadOperation] = []
+    size = 0
+    for key, ids in groups.items():
+        payload = json.loads(key)
+        for i in range(0, len(ids), UPDATE_BATCH):
+            part = ids[i:i + UPDATE_BATCH]
+            ops.append(SetPayloadOperation(set_payload=SetPayload(payload=payload, points=part)))
+            size += len(part)
+            if size >= UPDATE_BATCH:
+                q.batch_update_points(collection_name=collection, update_operations=ops)
+                ops, size = [], 0
+    if ops:
+        q.batch_update_points(collection_name=collection, update_operations=ops)
+
+
+@dataclass
+class EnrichStats:
+    points_seen: int = 0
+    checked_hh: int = 0
+    updated: int = 0
+    activated: int = 0
+    deactivated: int = 0
+    skipped_no_hh: int = 0
+    skipped_http: int = 0
+    by_tier: Dict[str, int] = field(default_factory=dict)
+    by_enricher: Counter = field(default_factory=Counter)
+
+    @property
+    def skipped(self) -> int:
+        return self.skipped_no_hh + self.skipped_http
+
+    def __str__(self) -> str:
+        # первая часть — прежняя строка валидатора
+        line = (
+            f"points_seen={self.points_seen} checked_hh={self.checked_hh} "
+            f"activated={self.activated} deactivated={self.deactivated} skipped={self.skipped} "
+            f"updated={self.updated} skipped_no_hh={self.skipped_no_hh} skipped_http={self.skipped_http}"
+        )
+        if self.by_enricher:
+            line += " enriched: " + " ".join(f"{k}={v}" for k, v in sorted(self.by_enricher.items()))
+        return line
+
+    def state(self) -> Dict[str, Any]:
+        return {**vars(self), "by_tier": dict(self.by_tier), "by_enricher": dict(self.by_enricher)}
+
+    @classmethod
+    def restore(cls, state: Dict[str, Any]) -> "EnrichStats":
+        return cls(**{**state, "by_enricher": Counter(state.get("by_enricher") or {})})
+
+
+async def enrich(
+    q: QdrantClient,
+    collection: str,
+    selected: Dict[str, Enricher],
+    plan: List[Tuple[str, Optional[Filter]]],
+    now: str,
+    budget: int = 0,
+    concurrency: int = CONCURRENCY,
+    user_agent: str = "JobRadar-AI enrichment",
+    checkpoint: Optional[ScrollCheckpoint] = None,
+    resume: Optional[Dict[str, Any]] = None,
+    total: Optional[int] = None,
+    max_age: Optional[float] = None,
+) -> EnrichStats:
+    """
+    Три стадии: scroll Qdrant -> concurrency запросов карточек hh.ru -> batch_update_points.
+    plan — фильтры в порядке приоритета; обход останавливается, когда взято budget
+    точек (0 — без ограничения). Вызовы Qdrant идут через один поток, чтобы не
+    блокировать цикл событий.
+
+    С checkpoint позиция обхода и счётчики сохраняются после каждой записи;
+    resume — загруженное состояние прерванного прогона (now у него свой, его
+    и надо передать). Счётчики после продолжения могут учесть последние
+    страницы дважды. total — ожидаемое число точек для индикатора прогресса.
+    max_age — сколько секунд карточке из кеша hh_client можно доверять (None — HH_CACHE_TTL_SEC).
+    """
+    stats = EnrichStats.restore(resume["stats"]) if resume else EnrichStats()
+    loop = asyncio.get_running_loop()
+    qdrant_io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="qdrant")
+    points_q: asyncio.Queue = asyncio.Queue(maxsize=SCROLL_LIMIT * 2)
+    flush_q: asyncio.Queue = asyncio.Queue(maxsize=4)
+    pending: Dict[str, List[Any]] = {}
+    pending_pages: List[int] = []
+    # незавершённые страницы scroll: seq -> [уровень, offset страницы, точек в работе]
+    pages: Dict[int, List[Any]] = {}
+    # позиция следующей страницы: (уровень, offset)
+    cursor: Tuple[int, Any] = (resume["tier"], resume["offset"]) if resume else (0, None)
+    pbar = tqdm(total=total, desc="Enriching") if total is not None else None
+
+    def qdrant_call(fn, *args, **kwargs):
+        return loop.run_in_executor(qdrant_io, partial(fn, *args, **kwargs))
+
+    def done(seq: int) -> None:
+        page = pages[seq]
+        page[2] -= 1
+        if page[2] == 0:
+            del pages[seq]
+
+    def save_checkpoint() -> None:
+        # самая ранняя недописанная страница, а если всё записано — следующая
+        tier, offset = next(((p[0], p[1]) for p in pages.values()), cursor)
+        state = {"now": now, "plan": [name for name, _ in plan], "tier": tier, "offset": offset}
+        checkpoint.save({**state, "stats": stats.state()})
+
+    async def scroller() -> None:
+        nonlocal cursor
+        seq = 0
+        start_tier, offset = cursor
+        for tier in range(start_tier, len(plan)):
+            name, scroll_filter = plan[tier]
+            if tier != start_tier:
+                offset = None
+            stats.by_tier.setdefault(name, 0)
+            while True:
+                limit = SCROLL_LIMIT
+                if budget > 0:
+                    limit = min(limit, budget - stats.points_seen)
+                    if limit <= 0:
+                        return
+                points, next_offset = await qdrant_call(
+                    q.scroll,
+                    collection_name=collection,
+                    limit=limit,
+                    offset=offset,
+                    with_payload=projection("url"),
+                    with_vectors=False,
+                    scroll_filter=scroll_filter,
+                )
+                if points:
+                    seq += 1
+                    pages[seq] = [tier, offset, len(points)]
+                exhausted = not points or next_offset is None
+                cursor = (tier + 1, None) if exhausted else (tier, next_offset)
+                stats.points_seen += len(points)
+                stats.by_tier[name] += len(points)
+                for pt in points:
+                    await points_q.put((seq, pt))
+                if exhausted:
+                    break
+                offset = next_offset
+
+    async def submit(force: bool = False) -> None:
+        nonlocal pending, pending_pages
+        if pending_pages and (force or len(pending_pages) >= UPDATE_BATCH):
+            item = (pending, pending_pages)
+            pending, pending_pages = {}, []
+            await flush_q.put(item)
+
+    async def checker(hc: httpx.AsyncClient) -> None:
+        while True:
+            item = await points_q.get()
+            if item is None:
+                points_q.task_done()
+                return
+            seq, pt = item
+            queued = False
+            try:
+                p = pt.payload or {}
+                hh_id = extract_hh_id((p.get("url") or p.get("alternate_url") or "").strip())
+                if not hh_id:
+                    stats.skipped_no_hh += 1
+                    continue
+                try:
+                    status, data = await afetch_vacancy(hc, hh_id, max_age=max_age)
+                except Exception:
+                    stats.skipped_http += 1
+                    continue
+                stats.checked_hh += 1
+
+                payload: Dict[str, Any] = {}
+                for name, fn in selected.items():
+                    fields = fn(status, data, now)
+                    if fields:
+                        stats.by_enricher[name] += 1
+                        payload.update(fields)
+                if not payload:
+                    continue
+                pending.setdefault(json.dumps(payload, sort_keys=True, ensure_ascii=False), []).append(pt.id)
+                pending_pages.append(seq)
+                queued = True
+                await submit()
+            finally:
+                if not queued:
+                    done(seq)
+                if pbar is not None:
+                    pbar.update(1)
+                points_q.task_done()
+
+    async def flusher() -> None:
+        while True:
+            item = await flush_q.get()
+            if item is None:
+                return
+            groups, seqs = item
+            await qdrant_call(flush_payload, q, collection, groups)
+            for key, ids in groups.items():
+                stats.updated += len(ids)
+                is_active = json.loads(key).get("is_active")
+                if is_active is True:
+                    stats.activated += len(ids)
+                elif is_active is False:
+                    stats.deactivated += len(ids)
+            for seq in seqs:
+                done(seq)
+            if checkpoint is not None:
+                save_checkpoint()
+
+    async def pump() -> None:
+        async with httpx.AsyncClient(timeout=20, headers={"User-Agent": user_agent}) as hc:
+            checkers = [asyncio.create_task(checker(hc)) for _ in range(max(1, concurrency))]
+            try:
+                await scroller()
+                for _ in checkers:
+                    await points_q.put(None)
+                await asyncio.gather(*checkers)
+            finally:
+                for task in checkers:
+                    task.cancel()
+        await submit(force=True)
+        await flush_q.put(None)
+
+    flush_task = asyncio.create_task(flusher())
+    pump_task = asyncio.create_task(pump())
+    # упавшая запись в Qdrant останавливает обход: иначе проверки повиснут на полной flush_q
+    flush_task.add_done_callback(lambda t: t.cancelled() or t.exception() is None or pump_task.cancel())
+    try:
+        try:
+            await pump_task
+        except asyncio.CancelledError:
+            if flush_task.done() and not flush_task.cancelled() and flush_task.exception() is not None:
+                raise flush_task.exception()
+            raise
+        await flush_task
+        if checkpoint is not None:
+            checkpoint.clear()
+    finally:
+        pump_task.cancel()
+        flush_task.cancel()
+        qdrant_io.shutdown(wait=True)
+        if pbar is not None:
+            pbar.close()
+    return stats
@@ -0,0 +1,133 @@
+"""
+Промежуточный файл вакансий между run_parser и upload_qdrant.
+
+Основной формат — Parquet (zstd) с явной схемой: все поля строковые, плюс
+row_hash — хеш полей вакансии, который парсер считает при записи, чтобы
+загрузчику не нужно было хешировать длинные описания заново. Parquet пишется
+порциями (row group на порцию) во временный файл и переименовывается при
+закрытии, так что загрузчик не увидит недописанный файл.
+
+Если pyarrow не установлен или HH_HANDOFF_FORMAT=csv, используется CSV,
+как раньше. Путь задаётся SAVE_VACANCIES_AIRFLOW_PATH; для Parquet
+расширение заменяется на .parquet, читатель сам выбирает доступный файл.
+"""
+import hashlib
+import os
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow опционален, без него — CSV
+    pa = None
+    pq = None
+
+HANDOFF_FORMAT = os.getenv("HH_HANDOFF_FORMAT", "parquet").lower()
+PARQUET_COMPRESSION = os.getenv("HH_PARQUET_COMPRESSION", "zstd")
+
+VACANCY_COLUMNS = ["title", "professional_roles_name", "company", "experience", "description", "url", "area_name"]
+HASH_COLUMN = "row_hash"
+
+SCHEMA = (
+    pa.schema(
+        [pa.field(col, pa.string()) for col in VACANCY_COLUMNS] + [pa.field(HASH_COLUMN, pa.string())],
+        metadata={"jobradar.handoff": "1"},
+    )
+    if pa is not None
+    else None
+)
+
+
+def use_parquet() -> bool:
+    return HANDOFF_FORMAT == "parquet" and pa is not None
+
+
+def handoff_path(path: str, parquet: Optional[bool] = None) -> str:
+    """Путь файла в выбранном формате: для Parquet — с расширением .parquet."""
+    parquet = use_parquet() if parquet is None else parquet
+    return str(Path(path).with_suffix(".parquet")) if parquet else path
+
+
+def row_hashes(df: pd.DataFrame) -> List[str]:
+    """Хеш полей вакансии (в порядке VACANCY_COLUMNS); пустые значения — пустые строки."""
+    cols = df.reindex(columns=VACANCY_COLUMNS).fillna("").astype(str)
+    joined = cols[VACANCY_COLUMNS[0]].str.cat([cols[c] for c in VACANCY_COLUMNS[1:]], sep="\x1f")
+    return [hashlib.blake2b(s.encode("utf-8"), digest_size=16).hexdigest() for s in joined]
+
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.reindex(columns=VACANCY_COLUMNS)
+    df = df.astype(object).where(df.notna(), None)
+    df[HASH_COLUMN] = row_hashes(df)
+    return df
+
+
+class VacancyWriter:
+    """Пишет вакансии порциями по chunk_size в Parquet или CSV; close() обязателен."""
+
+    def __init__(self, path: str, chunk_size: int, parquet: Optional[bool] = None):
+        self.parquet = use_parquet() if parquet is None else parquet
+        self.path = handoff_path(path, self.parquet)
+        self.chunk_size = max(1, chunk_size)
+        self.buffer: List[dict] = []
+        self.written = 0
+        self._header = True
+        self._tmp_path = self.path + ".tmp"
+        self._pq_writer = None
+
+    def write(self, rows: List[dict]) -> None:
+        self.buffer.extend(rows)
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.buffer and not self._header:
+            return
+        df = pd.DataFrame(self.buffer, columns=VACANCY_COLUMNS)
+        if self.parquet:
+            if self._pq_writer is None:
+                self._pq_writer = pq.ParquetWriter(self._tmp_path, SCHEMA, compression=PARQUET_COMPRESSION)
+            self._pq_writer.write_table(pa.Table.from_pandas(_normalize(df), schema=SCHEMA, preserve_index=False))
+        else:
+            df.to_csv(self.path, mode="w" if self._header else "a", header=self._header, index=False)
+        self._header = False
+        self.written += len(self.buffer)
+        self.buffer = []
+
+    def close(self) -> None:
+        self.flush()
+        if self._pq_writer is not None:
+            self._pq_writer.close()
+            self._pq_writer = None
+            os.replace(self._tmp_path, self.path)
+
+
+def write_vacancies(df: pd.DataFrame, path: str, parquet: Optional[bool] = None) -> str:
+    """Записывает весь DataFrame; возвращает фактический путь файла."""
+    writer = VacancyWriter(path, chunk_size=max(1, len(df)), parquet=parquet)
+    writer.write(df.reindex(columns=VACANCY_COLUMNS).to_dict("records"))
+    writer.close()
+    return writer.path
+
+
+def read_vacancies(path: str) -> pd.DataFrame:
+    """
+    Читает файл парсера: Parquet, если он есть и pyarrow установлен, иначе CSV по path.
+    Недостающие колонки добавляются пустыми строками.
+    """
+    parquet_path = handoff_path(path, parquet=True)
+    use_pq = pq is not None and os.path.exists(parquet_path)
+    # если рядом лежат оба файла, берём более свежий (формат могли переключить)
+    if use_pq and parquet_path != path and os.path.exists(path):
+        use_pq = os.path.getmtime(parquet_path) >= os.path.getmtime(path)
+    if use_pq:
+        df = pq.read_table(parquet_path).to_pandas()
+    else:
+        df = pd.read_csv(path)
+    for col in VACANCY_COLUMNS:
+        if col not in df.columns:
+            df[col] = ""
+    return df
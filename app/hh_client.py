@@ -0,0 +1,245 @@
+"""
+Общий слой получения карточек вакансий hh.ru (/vacancies/{id}) с дисковым кешем.
+
+Каждый потребитель (парсер, валидатор, бэкфилл) ходит за карточкой через
+fetch_vacancy()/afetch_vacancy(), поэтому один и тот же документ скачивается
+один раз за HH_CACHE_TTL_SEC, а после истечения TTL — перепроверяется условным
+запросом (If-None-Match / If-Modified-Since), если hh.ru отдал ETag/Last-Modified.
+
+В пределах TTL закешированная карточка отдаётся без запроса, так что свежий 404
+или archived=true виден только после её истечения. Валидатору, которому важен
+текущий статус, нужен max_age меньше TTL (см. VALIDATOR_CACHE_MAX_AGE_SEC).
+"""
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from proxy_pool import async_pooled_get, pooled_get
+from rate_limiter import arequest_with_retries, request_with_retries
+
+HH_API_BASE = os.getenv("HH_API_BASE", "https://api.hh.ru").rstrip("/")
+HH_VACANCY_API = HH_API_BASE + "/vacancies/{}"
+# формат published_at и date_from/date_to в API hh.ru
+HH_DATE_FMT = "%Y-%m-%dT%H:%M:%S%z"
+HH_ID_RE = re.compile(r"/vacanc(?:y|ies)/(\d+)", re.IGNORECASE)
+
+HH_CACHE_PATH = os.getenv(
+    "HH_CACHE_PATH", os.path.join(tempfile.gettempdir(), "jobradar", "hh_vacancy_cache.sqlite")
+)
+# сколько карточка (и её статус 404/archived) отдаётся из кеша без запроса к hh.ru
+HH_CACHE_TTL_SEC = float(os.getenv("HH_CACHE_TTL_SEC", str(6 * 3600)))
+HH_CACHE_MAX_MB = float(os.getenv("HH_CACHE_MAX_MB", "512"))
+# accessed_at (для LRU) обновляется не чаще раза в столько секунд: чтение не пишет в SQLite каждый раз
+HH_CACHE_TOUCH_SEC = float(os.getenv("HH_CACHE_TOUCH_SEC", "3600"))
+HH_CACHE_ENABLED = os.getenv("HH_CACHE_ENABLED", "1").lower() in ("1", "true", "yes")
+
+VacancyResult = Tuple[int, Optional[Dict[str, Any]]]
+
+
+def extract_hh_id(url: str) -> Optional[str]:
+    """ID вакансии из ссылки hh.ru/vacancy/<id> или api.hh.ru/vacancies/<id>."""
+    if not url:
+        return None
+    m = HH_ID_RE.search(url)
+    return m.group(1) if m else None
+
+
+@dataclass
+class CacheEntry:
+    hh_id: str
+    status: int
+    body: Optional[str]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.fetched_at < ttl
+
+    @property
+    def data(self) -> Optional[Dict[str, Any]]:
+        return json.loads(self.body) if self.body else None
+
+    def revalidation_headers(self) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if self.status != 200:
+            return headers
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class VacancyCache:
+    """
+    SQLite-кеш ответов /vacancies/{id}: тела хранятся сжатыми (zlib),
+    при превышении max_bytes вытесняются давно не читанные записи (LRU).
+    """
+
+    def __init__(self, path: str = HH_CACHE_PATH, ttl: float = HH_CACHE_TTL_SEC, max_mb: float = HH_CACHE_MAX_MB):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS vacancies (
+                hh_id TEXT PRIMARY KEY,
+                status INTEGER NOT NULL,
+                body BLOB,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS vacancies_accessed_at ON vacancies(accessed_at)")
+        self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM vacancies").fetchone()[0]
+
+    def get(self, hh_id: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, body, etag, last_modified, fetched_at, accessed_at FROM vacancies WHERE hh_id = ?",
+                (hh_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row[5] >= HH_CACHE_TOUCH_SEC:
+                self._db.execute("UPDATE vacancies SET accessed_at = ? WHERE hh_id = ?", (now, hh_id))
+        status, body, etag, last_modified, fetched_at, _ = row
+        text = zlib.decompress(body).decode("utf-8") if body else None
+        return CacheEntry(hh_id, status, text, etag, last_modified, fetched_at)
+
+    def put(
+        self,
+        hh_id: str,
+        status: int,
+        body: Optional[str],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        blob = zlib.compress(body.encode("utf-8")) if body else None
+        size = len(blob) if blob else 0
+        now = time.time()
+        with self._lock:
+            old = self._db.execute("SELECT size FROM vacancies WHERE hh_id = ?", (hh_id,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO vacancies VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (hh_id, status, blob, etag, last_modified, now, now, size),
+            )
+            self._total += size - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def mark_revalidated(self, hh_id: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE vacancies SET fetched_at = ?, accessed_at = ? WHERE hh_id = ?", (now, now, hh_id)
+            )
+
+    def _evict(self) -> None:
+        # освобождаем с запасом, чтобы не вытеснять по одной записи на каждый put
+        target = int(self.max_bytes * 0.9)
+        rows = self._db.execute("SELECT hh_id, size FROM vacancies ORDER BY accessed_at").fetchall()
+        victims = []
+        for hh_id, size in rows:
+            if self._total <= target:
+                break
+            victims.append((hh_id,))
+            self._total -= size
+        self._db.executemany("DELETE FROM vacancies WHERE hh_id = ?", victims)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM vacancies").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+_CACHE: Optional[VacancyCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_cache() -> Optional[VacancyCache]:
+    """Общий кеш на процесс; None, если кеш выключен через HH_CACHE_ENABLED=0."""
+    global _CACHE
+    if not HH_CACHE_ENABLED:
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = VacancyCache()
+        return _CACHE
+
+
+def _store(cache: Optional[VacancyCache], hh_id: str, entry: Optional[CacheEntry], r: httpx.Response) -> VacancyResult:
+    if r.status_code == 304 and entry is not None:
+        if cache is not None:
+            cache.mark_revalidated(hh_id)
+        return entry.status, entry.data
+    if r.status_code == 404:
+        if cache is not None:
+            cache.put(hh_id, 404, None)
+        return 404, None
+    r.raise_for_status()
+    data = r.json()
+    if cache is not None:
+        cache.put(hh_id, r.status_code, r.text, r.headers.get("ETag"), r.headers.get("Last-Modified"))
+    return r.status_code, data
+
+
+def fetch_vacancy(hc: httpx.Client, hh_id: str, cache: Optional[VacancyCache] = None) -> VacancyResult:
+    """
+    returns (status, data)
+    status 404 -> data None; остальные ошибки HTTP пробрасываются
+    """
+    cache = cache if cache is not None else get_cache()
+    entry = cache.get(hh_id) if cache is not None else None
+    if entry is not None and entry.is_fresh(cache.ttl):
+        return entry.status, entry.data
+    headers = entry.revalidation_headers() if entry is not None else None
+    url = HH_VACANCY_API.format(hh_id)
+    r = request_with_retries(lambda: pooled_get(hc, url, headers=headers))
+    return _store(cache, hh_id, entry, r)
+
+
+async def afetch_vacancy(
+    hc: httpx.AsyncClient,
+    hh_id: str,
+    cache: Optional[VacancyCache] = None,
+    max_age: Optional[float] = None,
+) -> VacancyResult:
+    """
+    Асинхронный fetch_vacancy. max_age (сек) вместо TTL кеша решает, когда запись
+    перепроверять: 0 — всегда условным запросом (304 не тянет тело заново).
+    Чтение и запись кеша (SQLite под блокировкой) идут в потоке, а не в цикле событий.
+    """
+    cache = cache if cache is not None else get_cache()
+    entry = await asyncio.to_thread(cache.get, hh_id) if cache is not None else None
+    if entry is not None and entry.is_fresh(cache.ttl if max_age is None else max_age):
+        return entry.status, entry.data
+    headers = entry.revalidation_headers() if entry is not None else None
+    url = HH_VACANCY_API.format(hh_id)
+    r = await arequest_with_retries(lambda: async_pooled_get(hc, url, headers=headers))
+    return await asyncio.to_thread(_store, cache, hh_id, entry, r)
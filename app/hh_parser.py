@@ -1,153 +1,394 @@
 """Парсер вакансий hh.ru."""
-from bs4 import BeautifulSoup
+import asyncio
 import json
-import random
-import time
 import os
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
+import httpx
 import pandas as pd
-import requests
+
+from hh_client import HH_API_BASE, afetch_vacancy, extract_hh_id, fetch_vacancy
+from handoff import VACANCY_COLUMNS, VacancyWriter, handoff_path, write_vacancies
+from html_text import html_to_text
+from ingest_state import INCREMENTAL, IngestState, parse_published_at
+from partition_planner import PARTITIONED, PartitionPlanner, role_ids
+from proxy_pool import USE_PROXY_POOL, async_pooled_get, get_pool
+from rate_limiter import HH_BACKOFF_BASE, HH_MAX_RETRIES, arequest_with_retries
 
 SAVE_VACANCIES_AIRFLOW_PATH = os.getenv("SAVE_VACANCIES_AIRFLOW_PATH")
 
-def find_proxis() -> list[str]:
-    """Возвращает список бесплатных HTTP-прокси."""
-    url = "https://free-proxy-list.net/"
-    response = requests.get(url)
-    response.raise_for_status()
-    soup = BeautifulSoup(response.text, "html.parser")
-    table = soup.find("table", {"class": "table table-striped table-bordered"})
-    proxies: list[str] = []
-    for row in table.find_all("tr")[1:]:
-        columns = row.find_all("td")
-        if columns:
-            ip = columns[0].text.strip()
-            port = columns[1].text.strip()
-            proxies.append(f"http://{ip}:{port}")
-    return proxies
-
-
-def retry_request(url, params=None, retries: int = 5, delay: int = 5):
-    """Выполняет запрос с повторными попытками, выбирая случайный прокси."""
-    for attempt in range(retries):
-        proxy = {"http": random.choice(find_proxis())}
-        try:
-            response = requests.get(url, params=params, proxies=proxy)
-            response.raise_for_status()
-            return response
-        except requests.exceptions.RequestException as e:
-            print(f"Ошибка при запросе с прокси {proxy}: {e}")
-            if attempt < retries - 1:
-                print(f"Попытка {attempt + 1} из {retries}. Повтор через {delay} секунд...")
-                time.sleep(delay)
-            else:
-                print(f"Максимальное количество попыток достигнуто: {url}")
-                raise
-
-
-def query(per_page, search_queries, area, period, pages_to_parse, field, skills_search):
-    """Получает список вакансий из API hh.ru."""
-    frames = []
-    for query in search_queries:
-        print(f"\n🔍 Обрабатываю запрос: '{query}'")
+HH_VACANCIES_API = f"{HH_API_BASE}/vacancies"
+HH_PROFESSIONAL_ROLES_API = f"{HH_API_BASE}/professional_roles"
+LIST_CONCURRENCY = int(os.getenv("HH_LIST_CONCURRENCY", "4"))
+DETAIL_CONCURRENCY = int(os.getenv("HH_DETAIL_CONCURRENCY", "8"))
+HTTP_TIMEOUT = float(os.getenv("HH_HTTP_TIMEOUT", "20"))
+STREAMING = os.getenv("HH_STREAMING", "0").lower() in ("1", "true", "yes")
+STREAM_CHUNK_SIZE = int(os.getenv("HH_STREAM_CHUNK_SIZE", "200"))
+# страниц поиска, которые потоковый парсер держит в памяти одновременно
+STREAM_PAGE_WINDOW = int(os.getenv("HH_STREAM_PAGE_WINDOW", str(2 * LIST_CONCURRENCY)))
+
+OUTPUT_COLUMNS = VACANCY_COLUMNS
+
+
+async def async_retry_request(
+    client: httpx.AsyncClient, url, params=None, retries: int = HH_MAX_RETRIES, delay: float = HH_BACKOFF_BASE, headers=None
+) -> httpx.Response:
+    """
+    GET через общий ограничитель частоты с повторами (и пул прокси при HH_USE_PROXY)
+    поверх общего httpx.AsyncClient; 404 и 304 отдаются как есть.
+    """
+    response = await arequest_with_retries(
+        lambda: async_pooled_get(client, url, params=params, headers=headers), retries=retries, base_delay=delay
+    )
+    if response.status_code not in (304, 404):
+        response.raise_for_status()
+    return response
+
+
+async def _fetch_detail(
+    client: httpx.AsyncClient, detail_sem: asyncio.Semaphore, vacancy_id: str
+) -> dict | None:
+    """Карточка вакансии через общий кеш hh_client; None при ошибке."""
+    try:
+        async with detail_sem:
+            status, vacancy_data = await afetch_vacancy(client, vacancy_id)
+        if vacancy_data is None:
+            raise ValueError(f"HTTP {status}")
+        return vacancy_data
+    except Exception as e:
+        print(f"Ошибка при получении ID {vacancy_id}: {e}")
+        return None
+
+
+async def _fetch_key_skills(
+    client: httpx.AsyncClient, detail_sem: asyncio.Semaphore, item: dict
+) -> bool:
+    """
+    Дозаполняет item["key_skills"] из карточки вакансии (карточка остаётся в кеше для add_description).
+    Возвращает False, если карточка не скачалась.
+    """
+    vacancy_data = await _fetch_detail(client, detail_sem, item["id"])
+    if vacancy_data is None:
+        item["key_skills"] = None
+        return False
+    key_skills = vacancy_data.get("key_skills", [])
+    item["key_skills"] = ", ".join(skill["name"] for skill in key_skills)
+    return True
+
+
+async def _fetch_list_page(
+    client: httpx.AsyncClient,
+    list_sem: asyncio.Semaphore,
+    search_query: str,
+    params: dict,
+    state: IngestState | None = None,
+    run_seen: set | None = None,
+    area=None,
+    max_found: int | None = None,
+) -> list[dict]:
+    """
+    Одна страница поиска без карточек; уже залитые и уже встреченные в прогоне вакансии отбрасываются.
+    Если страница не скачалась или поиск нашёл больше max_found вакансий (столько выкачивают
+    pages_to_parse страниц), водяной знак запроса в этом прогоне не сдвигается.
+    """
+    try:
+        async with list_sem:
+            response = await async_retry_request(client, HH_VACANCIES_API, params=params)
+        data_json = response.json()
+    except Exception as e:
+        print(f"Ошибка при запросе списка: {e}")
+        if state is not None:
+            state.mark_failed(search_query, area)
+        return []
+    if state is not None and max_found is not None and int(data_json.get("found") or 0) > max_found:
+        state.mark_truncated(search_query, area)
+    items = data_json.get("items") or []
+    if not items:
+        print(f"    Вакансии не найдены: '{search_query}', страница {params['page'] + 1}")
+        return []
+    if state is not None:
+        # вакансия, переопубликованная с новым published_at, снова проходит
+        items = [item for item in items if not state.is_seen(item.get("id"), item.get("published_at"))]
+    if run_seen is not None:
+        # срезы партиционированного поиска могут пересекаться
+        fresh = []
+        for item in items:
+            key = (search_query, item.get("id"))
+            if key not in run_seen:
+                run_seen.add(key)
+                fresh.append(item)
+        items = fresh
+    return items
+
+
+async def _fetch_page(
+    client: httpx.AsyncClient,
+    list_sem: asyncio.Semaphore,
+    detail_sem: asyncio.Semaphore,
+    search_query: str,
+    params: dict,
+    state: IngestState | None = None,
+    run_seen: set | None = None,
+    area=None,
+    max_found: int | None = None,
+) -> list[dict]:
+    """
+    Скачивает одну страницу поиска и карточки всех её вакансий (кроме уже залитых).
+    Вакансии без карточки отбрасываются, а водяной знак запроса не сдвигается (как в _stream_page).
+    """
+    items = await _fetch_list_page(client, list_sem, search_query, params, state, run_seen, area, max_found)
+    fetched = await asyncio.gather(*(_fetch_key_skills(client, detail_sem, item) for item in items))
+    if not all(fetched):
+        print(f"    Пропущено вакансий без карточки: {fetched.count(False)} ('{search_query}')")
+        if state is not None:
+            state.mark_failed(search_query, area)
+        items = [item for item, ok in zip(items, fetched) if ok]
+    for item in items:
+        item["search_query"] = search_query
+    return items
+
+
+def _page_params(per_page, search_queries, area, period, pages_to_parse, field, state: IngestState | None = None):
+    """Пары (запрос, параметры страницы) в порядке последовательного обхода."""
+    for search_query in search_queries:
+        print(f"\n🔍 Обрабатываю запрос: '{search_query}' ({pages_to_parse} стр.)")
+        date_from = state.date_from(search_query, area, period) if state is not None else None
         for page in range(pages_to_parse):
-            print(f"  Страница {page + 1} из {pages_to_parse}")
-            url = "https://api.hh.ru/vacancies"
             params = {
                 "page": page,
                 "per_page": per_page,
-                "text": f"!{query}",
+                "text": f"!{search_query}",
                 "area": area,
                 "period": period,
                 "field": field,
             }
-            try:
-                response = retry_request(url, params=params)
-                data_json = response.json()
-                if not data_json.get("items"):
-                    print("    Вакансии не найдены.")
-                    continue
-                for item in data_json["items"]:
-                    vacancy_id = item["id"]
-                    vacancy_url = f"https://api.hh.ru/vacancies/{vacancy_id}"
-                    try:
-                        vacancy_response = retry_request(vacancy_url)
-                        vacancy_data = vacancy_response.json()
-                        key_skills = vacancy_data.get("key_skills", [])
-                        skills = [skill["name"] for skill in key_skills]
-                        item["key_skills"] = ", ".join(skills)
-                    except Exception as e:
-                        print(f"Ошибка при получении ID {vacancy_id}: {e}")
-                        item["key_skills"] = None
-                    item["search_query"] = query
-                    frames.append(item)
-                    time.sleep(0.2)
-            except Exception as e:
-                print(f"Ошибка при запросе списка: {e}")
-                continue
-    return frames
+            if date_from:
+                # hh.ru не принимает period вместе с date_from; выдача по дате, чтобы
+                # отрезанные pages_to_parse вакансии были старше водяного знака, а не вперемешку
+                params.pop("period")
+                params["date_from"] = date_from
+                params["order_by"] = "publication_time"
+            yield search_query, params
+
+
+async def _partitioned_page_params(
+    client: httpx.AsyncClient,
+    list_sem: asyncio.Semaphore,
+    per_page,
+    search_queries,
+    area,
+    period,
+    field,
+    state: IngestState | None = None,
+) -> list[tuple[str, dict]]:
+    """Страницы всех срезов, на которые PartitionPlanner разбил каждый запрос."""
+
+    async def fetch_json(params: dict) -> dict:
+        async with list_sem:
+            response = await async_retry_request(client, HH_VACANCIES_API, params=params)
+        return response.json()
+
+    roles_response = await async_retry_request(client, HH_PROFESSIONAL_ROLES_API)
+    planner = PartitionPlanner(fetch_json, roles=role_ids(roles_response.json()))
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+
+    async def plan_query(search_query: str) -> list[tuple[str, dict]]:
+        watermark = state.date_from(search_query, area, period) if state is not None else None
+        date_from = parse_published_at(watermark) if watermark else now - timedelta(days=period)
+        slices = await planner.plan([search_query], area, date_from, now, field)
+        found = sum(sl.found for sl in slices)
+        print(f"\n🔍 Запрос '{search_query}': {len(slices)} срезов, найдено {found}")
+        return [(search_query, sl.params(per_page, page)) for sl in slices for page in range(sl.pages(per_page))]
+
+    planned = await asyncio.gather(*(plan_query(q) for q in search_queries))
+    if planner.truncated:
+        print(f"⚠️ Срезов упёрлось в лимит глубины: {len(planner.truncated)}")
+        if state is not None:
+            for sl in planner.truncated:
+                state.mark_truncated(sl.search_query, area)
+    return [pair for pairs in planned for pair in pairs]
+
+
+def _max_found(per_page, pages_to_parse, partitioned: bool) -> int | None:
+    """Сколько вакансий выкачивает обход без разбиения; срезы PartitionPlanner выкачиваются целиком."""
+    return None if partitioned else per_page * pages_to_parse
+
+
+async def _search_page_params(
+    client: httpx.AsyncClient,
+    list_sem: asyncio.Semaphore,
+    per_page,
+    search_queries,
+    area,
+    period,
+    pages_to_parse,
+    field,
+    state: IngestState | None = None,
+    partitioned: bool = False,
+) -> list[tuple[str, dict]]:
+    if partitioned:
+        return await _partitioned_page_params(client, list_sem, per_page, search_queries, area, period, field, state)
+    return list(_page_params(per_page, search_queries, area, period, pages_to_parse, field, state))
+
+
+async def query_async(
+    per_page,
+    search_queries,
+    area,
+    period,
+    pages_to_parse,
+    field,
+    skills_search,
+    list_concurrency: int = LIST_CONCURRENCY,
+    detail_concurrency: int = DETAIL_CONCURRENCY,
+    state: IngestState | None = None,
+    partitioned: bool = PARTITIONED,
+) -> list[dict]:
+    """
+    Параллельно получает вакансии из API hh.ru с ограничением числа запросов в полёте.
+    С state (инкрементальный режим) окно поиска начинается с водяного знака запроса,
+    а карточки уже залитых вакансий не запрашиваются. С partitioned поиск режется
+    на срезы под лимит глубины hh.ru, pages_to_parse при этом не используется.
+    """
+    list_sem = asyncio.Semaphore(max(1, list_concurrency))
+    detail_sem = asyncio.Semaphore(max(1, detail_concurrency))
+    run_seen: set | None = set() if partitioned else None
+    max_found = _max_found(per_page, pages_to_parse, partitioned)
+    async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
+        try:
+            page_params = await _search_page_params(
+                client, list_sem, per_page, search_queries, area, period, pages_to_parse, field, state, partitioned
+            )
+            pages = await asyncio.gather(
+                *(
+                    _fetch_page(client, list_sem, detail_sem, search_query, params, state, run_seen, area, max_found)
+                    for search_query, params in page_params
+                )
+            )
+        finally:
+            if USE_PROXY_POOL:
+                await get_pool().aclose_async_clients()
+    # порядок frames тот же, что и при последовательном обходе: запрос → страница → вакансия
+    return [item for items in pages for item in items]
+
+
+def query(
+    per_page,
+    search_queries,
+    area,
+    period,
+    pages_to_parse,
+    field,
+    skills_search,
+    list_concurrency: int = LIST_CONCURRENCY,
+    detail_concurrency: int = DETAIL_CONCURRENCY,
+    state: IngestState | None = None,
+    partitioned: bool = PARTITIONED,
+):
+    """Получает список вакансий из API hh.ru."""
+    return asyncio.run(
+        query_async(
+            per_page,
+            search_queries,
+            area,
+            period,
+            pages_to_parse,
+            field,
+            skills_search,
+            list_concurrency=list_concurrency,
+            detail_concurrency=detail_concurrency,
+            state=state,
+            partitioned=partitioned,
+        )
+    )
+
+
+# колонка результата -> путь до значения в сыром item hh.ru
+FLAT_SCHEMA: dict[str, tuple] = {
+    "name": ("name",),
+    "published_at": ("published_at",),
+    "url": ("url",),
+    "alternate_url": ("alternate_url",),
+    "employer_name": ("employer", "name"),
+    "experience_name": ("experience", "name"),
+    "schedule_name": ("schedule", "name"),
+    "professional_roles_name": ("professional_roles", 0, "name"),
+    "area_name": ("area", "name"),
+}
+
+
+def _pluck(item: dict, path: tuple):
+    value = item
+    for key in path:
+        if isinstance(key, int):
+            if not isinstance(value, list) or len(value) <= key:
+                return None
+            value = value[key]
+        else:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+    return value
+
+
+def flatten_items(frames: list[dict], schema: dict[str, tuple] = FLAT_SCHEMA) -> dict[str, list]:
+    """За один проход раскладывает нужные поля сырых вакансий по колонкам."""
+    columns: dict[str, list] = {col: [] for col in schema}
+    paths = list(schema.items())
+    for item in frames:
+        for col, path in paths:
+            columns[col].append(_pluck(item, path))
+    return columns
 
 
 def df_main(frames: list[dict]) -> pd.DataFrame:
     """Нормализует список вакансий в DataFrame."""
-    cols = [
-        "name",
-        "published_at",
-        "url",
-        "alternate_url",
-        "employer_name",
-        "experience_name",
-        "schedule_name",
-        "professional_roles_name",
-        "area_name",
-    ]
+    cols = list(FLAT_SCHEMA)
     if not frames:
         print("\n❌ Не удалось собрать данные.")
         return pd.DataFrame(columns=cols)
-    result = pd.DataFrame(frames)
-    result1 = result.copy()
-    for col in result.columns:
-        df_normalized = pd.json_normalize(result[col])
-        if len(df_normalized.columns) > 1:
-            df_normalized.columns = [f"{col}_{c}" for c in df_normalized.columns]
-            result1 = pd.concat([result1.drop(columns=[col]), df_normalized], axis=1)
-    result1["professional_roles_id"] = result1["professional_roles"].apply(
-        lambda x: x[0]["id"] if x else None
-    )
-    result1["professional_roles_name"] = result1["professional_roles"].apply(
-        lambda x: x[0]["name"] if x else None
-    )
-    while True:
-        columns_to_drop = []
-        for col in result1.columns:
-            if not result1[col].empty and result1[col].apply(lambda x: isinstance(x, (dict, list))).any():
-                columns_to_drop.append(col)
-        if columns_to_drop:
-            result1.drop(columns=columns_to_drop, inplace=True)
-        else:
-            break
-    return result1[cols]
+    return pd.DataFrame(flatten_items(frames), columns=cols)
+
+
+def description_text(data: dict | None) -> str:
+    """Возвращает чистый текст описания из уже разобранной карточки вакансии."""
+    return html_to_text((data or {}).get("description", ""))
 
 
 def extract_description(vacancy_json: str) -> str:
     """Возвращает чистый текст описания вакансии из JSON."""
-    data = json.loads(vacancy_json)
-    html_description = data.get("description", "")
-    if not html_description:
-        return ""
-    soup = BeautifulSoup(html_description, "html.parser")
-    return soup.get_text(separator=" ", strip=True)
+    return description_text(json.loads(vacancy_json))
 
 
-def add_description(df: pd.DataFrame) -> pd.DataFrame:
-    """Добавляет колонку description, запрашивая описание по API URL."""
+def add_description(df: pd.DataFrame, state: IngestState | None = None, area=None) -> pd.DataFrame:
+    """
+    Добавляет колонку description; карточки берутся из общего кеша hh_client.
+    Строки, чья карточка не скачалась (404, ошибка запроса или url без ID hh.ru),
+    отбрасываются, а водяные знаки их запросов (колонка search_query) не сдвигаются.
+    """
     descriptions = []
-    for api_url in df["url"]:
-        response = requests.get(api_url)
-        response.raise_for_status()
-        descriptions.append(extract_description(response.text))
+    with httpx.Client(timeout=HTTP_TIMEOUT) as hc:
+        for api_url in df["url"]:
+            hh_id = extract_hh_id(api_url) if isinstance(api_url, str) else None
+            if not hh_id:
+                print(f"Нет ID вакансии в url: {api_url!r}")
+                descriptions.append(None)
+                continue
+            try:
+                _status, data = fetch_vacancy(hc, hh_id)
+            except Exception as e:
+                print(f"Ошибка при получении описания {api_url}: {e}")
+                data = None
+            descriptions.append(None if data is None else description_text(data))
     df["description"] = descriptions
+    missing = df["description"].isna()
+    if missing.any():
+        print(f"Пропущено вакансий без карточки: {int(missing.sum())}")
+        if state is not None and "search_query" in df:
+            for search_query in df.loc[missing, "search_query"].unique():
+                state.mark_failed(search_query, area)
+        df = df[~missing].reset_index(drop=True)
     return df
 
 
@@ -160,13 +401,24 @@ def parse_hh_vacancies(
     field: str = "name",
     skills_search: bool = False,
     prof_names: list[str] | None = None,
+    incremental: bool = INCREMENTAL,
+    partitioned: bool = PARTITIONED,
 ) -> pd.DataFrame:
-    frames = query(per_page, search_queries, area, period, pages_to_parse, field, skills_search)
+    state = IngestState() if incremental else None
+    frames = query(
+        per_page, search_queries, area, period, pages_to_parse, field, skills_search, state=state, partitioned=partitioned
+    )
     df = df_main(frames)
+    df["search_query"] = [item.get("search_query") for item in frames]
     if prof_names:
         df = df[df["professional_roles_name"].isin(prof_names)]
     df = df.reset_index(drop=True)
-    df = add_description(df)
+    df = add_description(df, state, area)
+    if state is not None:
+        state.stage_seen(zip(df["url"].map(extract_hh_id), df["published_at"]))
+        # после add_description: запросы с потерянными карточками уже помечены mark_failed
+        state.stage_watermarks(frames, area)
+        print(f"Инкрементальный режим: новых вакансий {len(frames)}")
     df.drop(columns= "url",inplace=True)
     df = df.rename(
         columns={
@@ -176,12 +428,156 @@ def parse_hh_vacancies(
             "alternate_url": "url",
         }
     )
-    return df[["title","professional_roles_name", "company", "experience", "description", "url","area_name"]]
+    return df[OUTPUT_COLUMNS]
+
+
+def _output_row(flat: dict, description: str) -> dict:
+    """Строка итогового файла из плоской вакансии (как после rename в parse_hh_vacancies)."""
+    return {
+        "title": flat["name"],
+        "professional_roles_name": flat["professional_roles_name"],
+        "company": flat["employer_name"],
+        "experience": flat["experience_name"],
+        "description": description,
+        "url": flat["alternate_url"],
+        "area_name": flat["area_name"],
+    }
+
+
+async def _stream_page(
+    client: httpx.AsyncClient,
+    list_sem: asyncio.Semaphore,
+    detail_sem: asyncio.Semaphore,
+    search_query: str,
+    params: dict,
+    area,
+    prof_names: list[str] | None,
+    state: IngestState | None,
+    run_seen: set | None = None,
+    max_found: int | None = None,
+) -> list[dict]:
+    """
+    Страница поиска → flatten → фильтр по ролям → описания; карточки качаются только для прошедших фильтр.
+    Вакансии, чья карточка не скачалась, не пишутся: без описания их нельзя заливать,
+    а водяной знак запроса не сдвигается, чтобы следующий прогон забрал их снова.
+    """
+    items = await _fetch_list_page(client, list_sem, search_query, params, state, run_seen, area, max_found)
+    if state is not None:
+        for item in items:
+            item["search_query"] = search_query
+            state.observe(item, area)
+    paths = list(FLAT_SCHEMA.items())
+    flats = [(item["id"], {col: _pluck(item, path) for col, path in paths}) for item in items]
+    if prof_names:
+        flats = [(vacancy_id, flat) for vacancy_id, flat in flats if flat["professional_roles_name"] in prof_names]
+    details = await asyncio.gather(*(_fetch_detail(client, detail_sem, vacancy_id) for vacancy_id, _ in flats))
+    rows = [_output_row(flat, description_text(data)) for (_, flat), data in zip(flats, details) if data is not None]
+    if state is not None:
+        state.stage_seen(
+            (vacancy_id, flat["published_at"]) for (vacancy_id, flat), data in zip(flats, details) if data is not None
+        )
+    if len(rows) < len(flats):
+        print(f"    Пропущено вакансий без карточки: {len(flats) - len(rows)} ('{search_query}')")
+        if state is not None:
+            state.mark_failed(search_query, area)
+    return rows
+
+
+async def stream_async(
+    out_path: str,
+    search_queries,
+    per_page: int,
+    area,
+    period: int,
+    pages_to_parse: int,
+    field: str,
+    prof_names: list[str] | None = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    list_concurrency: int = LIST_CONCURRENCY,
+    detail_concurrency: int = DETAIL_CONCURRENCY,
+    state: IngestState | None = None,
+    partitioned: bool = PARTITIONED,
+    page_window: int = STREAM_PAGE_WINDOW,
+) -> int:
+    """
+    Потоково пишет вакансии в out_path. Страница занимает место в окне page_window
+    от запроса списка до передачи строк в VacancyWriter, так что в памяти
+    одновременно не больше page_window страниц.
+    """
+    list_sem = asyncio.Semaphore(max(1, list_concurrency))
+    detail_sem = asyncio.Semaphore(max(1, detail_concurrency))
+    page_sem = asyncio.Semaphore(max(1, page_window))
+    writer = VacancyWriter(out_path, chunk_size)
+    run_seen: set | None = set() if partitioned else None
+    max_found = _max_found(per_page, pages_to_parse, partitioned)
+    async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
+        try:
+            page_params = await _search_page_params(
+                client, list_sem, per_page, search_queries, area, period, pages_to_parse, field, state, partitioned
+            )
+
+            async def stream_page(search_query: str, params: dict) -> None:
+                async with page_sem:
+                    writer.write(
+                        await _stream_page(
+                            client, list_sem, detail_sem, search_query, params, area, prof_names, state, run_seen,
+                            max_found,
+                        )
+                    )
+
+            await asyncio.gather(*(stream_page(search_query, params) for search_query, params in page_params))
+        finally:
+            writer.close()
+            if USE_PROXY_POOL:
+                await get_pool().aclose_async_clients()
+    return writer.written
+
+
+def stream_hh_vacancies(
+    search_queries,
+    out_path: str,
+    per_page: int = 50,
+    area: list[int] = [1,2,3],
+    period: int = 1,
+    pages_to_parse: int = 2,
+    field: str = "name",
+    prof_names: list[str] | None = None,
+    incremental: bool = INCREMENTAL,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    partitioned: bool = PARTITIONED,
+) -> int:
+    """
+    Потоковый аналог write_vacancies(parse_hh_vacancies(...), out_path): возвращает число записанных вакансий.
+    Файл пишется в формате HH_HANDOFF_FORMAT (см. handoff.handoff_path()).
+    """
+    state = IngestState() if incremental else None
+    written = asyncio.run(
+        stream_async(
+            out_path,
+            search_queries,
+            per_page,
+            area,
+            period,
+            pages_to_parse,
+            field,
+            prof_names=prof_names,
+            chunk_size=chunk_size,
+            state=state,
+            partitioned=partitioned,
+        )
+    )
+    if state is not None:
+        state.write_pending()
+    return written
 
 
 if __name__ == "__main__":
     queries = ["Data Scientist","ML Engineer",'Аналитик']
-    result_df = parse_hh_vacancies(queries,prof_names=["Дата-сайентист",'Аналитик'])
-    result_df.to_csv(SAVE_VACANCIES_AIRFLOW_PATH, index=False)
+    if STREAMING:
+        written = stream_hh_vacancies(queries, SAVE_VACANCIES_AIRFLOW_PATH, prof_names=["Дата-сайентист",'Аналитик'])
+        print(f"Записано вакансий: {written}")
+    else:
+        result_df = parse_hh_vacancies(queries,prof_names=["Дата-сайентист",'Аналитик'])
+        write_vacancies(result_df, SAVE_VACANCIES_AIRFLOW_PATH)
     print("cwd:", os.getcwd())
-    print(f"✅ Файл сохранён: {SAVE_VACANCIES_AIRFLOW_PATH}")
+    print(f"✅ Файл сохранён: {handoff_path(SAVE_VACANCIES_AIRFLOW_PATH)}")
@@ -0,0 +1,91 @@
+"""
+Извлечение текста из HTML-описаний вакансий.
+
+Бэкенд по умолчанию ("fast") — однопроходный регулярный токенизатор без
+построения дерева; на редких конструкциях, которые он разбирает иначе, чем
+html.parser (CDATA, <template>, незакрытый script/style или комментарий,
+"--" внутри комментария, закрывающий тег не с буквы вроде </ br>, сущности
+без ";" или неизвестные), документ отдаётся BeautifulSoup. На корпусе и граничных
+случаях из bench/bench_html_text.py результат совпадает с
+BeautifulSoup(html, "html.parser").get_text(separator=" ", strip=True).
+"""
+import os
+import re
+from html import unescape
+from html.entities import html5
+from typing import Callable, Dict, Optional
+
+from bs4 import BeautifulSoup
+
+HTML_TEXT_BACKEND = os.getenv("HH_HTML_BACKEND", "fast")
+
+# всё, что не даёт текста: комментарии, script/style целиком, <!DOCTYPE>/<?...?>, обычные теги
+_NON_TEXT_RE = re.compile(
+    r"""<!--.*?-->"""
+    r"""|<(script|style)\b(?:[^>"']|"[^"]*"|'[^']*')*>.*?</\1\s*>"""
+    r"""|<[!?][^>]*>"""
+    r"""|</?[A-Za-z](?:[^>"']|"[^"]*"|'[^']*')*>""",
+    re.S | re.I,
+)
+_SEP = "\x00"
+# конструкции, на которых документ отдаётся BeautifulSoup
+_FALLBACK_RE = re.compile(
+    r"<!\[CDATA\[|<template\b|</(?![A-Za-z])"
+    # незакрытый комментарий и "--" внутри комментария
+    r"|<!--(?!.*?-->)|<!--(?:(?!-->).)*?--(?!>)",
+    re.S | re.I,
+)
+_ENTITY_RE = re.compile(r"&(#[0-9]+|#[xX][0-9A-Fa-f]+|[A-Za-z][A-Za-z0-9]*)(;?)")
+_RAW_OPEN_RE = re.compile(r"<(?:script|style)\b", re.I)
+_RAW_CLOSE_RE = re.compile(r"</(?:script|style)\s*>", re.I)
+
+
+def bs4_text(html: str) -> str:
+    return BeautifulSoup(html, "html.parser").get_text(separator=" ", strip=True)
+
+
+def _plain_entities(html: str) -> bool:
+    """Все сущности с ";" и известны: их unescape() раскрывает так же, как bs4."""
+    if "&" not in html:
+        return True
+    for m in _ENTITY_RE.finditer(html):
+        name, semicolon = m.groups()
+        if not semicolon or (not name.startswith("#") and f"{name};" not in html5):
+            return False
+    return True
+
+
+def _needs_fallback(html: str) -> bool:
+    if _FALLBACK_RE.search(html):
+        return True
+    # незакрытый script/style html.parser считает содержимым до конца документа
+    opened = len(_RAW_OPEN_RE.findall(html))
+    return opened > 0 and opened != len(_RAW_CLOSE_RE.findall(html))
+
+
+def fast_text(html: str) -> str:
+    if _needs_fallback(html):
+        return bs4_text(html)
+    text = _NON_TEXT_RE.sub(_SEP, html)
+    # сущности проверяем только в тексте: в атрибутах (href="?a=1&b=2") они на результат не влияют
+    if not _plain_entities(text):
+        return bs4_text(html)
+    parts = (unescape(chunk).strip() for chunk in text.split(_SEP))
+    return " ".join(p for p in parts if p)
+
+
+BACKENDS: Dict[str, Callable[[str], str]] = {
+    "fast": fast_text,
+    "bs4": bs4_text,
+}
+
+
+def register_backend(name: str, fn: Callable[[str], str]) -> None:
+    BACKENDS[name] = fn
+
+
+def html_to_text(html: Optional[str], backend: Optional[str] = None) -> str:
+    """Чистый текст из HTML выбранным бэкендом (по умолчанию HH_HTML_BACKEND)."""
+    if not html:
+        return ""
+    return BACKENDS[backend or HTML_TEXT_BACKEND](html)
@@ -0,0 +1,190 @@
+"""
+Состояние инкрементальной загрузки: водяные знаки published_at по поисковым
+запросам и компактный индекс уже залитых в Qdrant публикаций вакансий hh.ru.
+
+Отсекает старое водяной знак (date_from поиска); индекс лишь экономит карточки
+на границе окна и при повторном проходе запроса, водяной знак которого не сдвинулся.
+Ключ индекса — (ID, published_at): отредактированную или переопубликованную
+вакансию hh.ru отдаёт с новым published_at, и она снова идёт в Qdrant.
+
+Парсер только читает индекс и складывает новые водяные знаки и записанные
+публикации в pending-файлы; uploader после успешного upsert фиксирует их,
+так что упавший на заливке прогон не теряет вакансии при перезапуске.
+Парсер и uploader могут выполняться на разных воркерах, поэтому INGEST_STATE_DIR
+обязателен и должен указывать на общий постоянный том.
+"""
+import json
+import os
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from hh_client import HH_DATE_FMT
+
+INGEST_STATE_DIR = os.getenv("INGEST_STATE_DIR")
+INCREMENTAL = os.getenv("HH_INCREMENTAL", "0").lower() in ("1", "true", "yes")
+
+
+def parse_published_at(value: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, HH_DATE_FMT)
+    except ValueError:
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+
+
+def listing_key(hh_id, published_at) -> Optional[Tuple[int, int]]:
+    """Ключ индекса: (ID вакансии, published_at в секундах эпохи)."""
+    published = parse_published_at(published_at or "")
+    try:
+        return (int(hh_id), int(published.timestamp())) if published is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def watermark_key(search_query: str, area: Iterable) -> str:
+    areas = area if isinstance(area, (list, tuple)) else [area]
+    return f"{search_query}|{','.join(str(a) for a in areas)}"
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class IngestState:
+    def __init__(self, state_dir: Optional[str] = None):
+        state_dir = state_dir or INGEST_STATE_DIR
+        if not state_dir:
+            raise RuntimeError("INGEST_STATE_DIR не задан: инкрементальному режиму нужен общий каталог состояния")
+        self.state_dir = state_dir
+        os.makedirs(state_dir, exist_ok=True)
+        self.watermarks_path = os.path.join(state_dir, "watermarks.json")
+        self.pending_path = os.path.join(state_dir, "watermarks.pending.json")
+        self.seen_path = os.path.join(state_dir, "seen_listings.bin")
+        self.seen_pending_path = os.path.join(state_dir, "seen_listings.pending.bin")
+        self.watermarks: Dict[str, str] = self._read_json(self.watermarks_path)
+        self._seen: Optional[Set[Tuple[int, int]]] = None
+        self._staged_seen: Set[Tuple[int, int]] = set()
+        self._staged: Dict[str, datetime] = {}
+        # запросы, у которых в этом прогоне не скачалась страница: их водяной знак не двигаем
+        self._failed: Set[str] = set()
+        # запросы, не выбранные до конца из-за лимита страниц: их водяной знак тоже не двигаем
+        self._truncated: Set[str] = set()
+
+    @staticmethod
+    def _read_json(path: str) -> Dict[str, str]:
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    # --- индекс публикаций ---
+
+    @staticmethod
+    def _read_listings(path: str) -> Set[Tuple[int, int]]:
+        # пары uint64 (ID, published_at): 16 байт на публикацию
+        flat = array("Q")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                flat.frombytes(f.read())
+        return set(zip(flat[::2], flat[1::2]))
+
+    @staticmethod
+    def _write_listings(path: str, listings: Iterable[Tuple[int, int]]) -> None:
+        _atomic_write(path, array("Q", [x for key in sorted(listings) for x in key]).tobytes())
+
+    @property
+    def seen(self) -> Set[Tuple[int, int]]:
+        if self._seen is None:
+            self._seen = self._read_listings(self.seen_path)
+        return self._seen
+
+    def is_seen(self, hh_id, published_at) -> bool:
+        return listing_key(hh_id, published_at) in self.seen
+
+    def stage_seen(self, listings: Iterable[Tuple]) -> None:
+        """Публикации (ID, published_at), записанные в файл парсера; в индекс их переносит commit_seen()."""
+        for hh_id, published_at in listings:
+            key = listing_key(hh_id, published_at)
+            if key is not None:
+                self._staged_seen.add(key)
+
+    def commit_seen(self) -> None:
+        """Переносит pending-публикации в индекс после успешной заливки."""
+        if not os.path.exists(self.seen_pending_path):
+            return
+        self.seen.update(self._read_listings(self.seen_pending_path))
+        self._write_listings(self.seen_path, self.seen)
+        os.remove(self.seen_pending_path)
+
+    # --- водяные знаки ---
+
+    def date_from(self, search_query: str, area, period_days: int) -> Optional[str]:
+        """date_from для поиска hh.ru, если водяной знак попадает внутрь окна period."""
+        wm = parse_published_at(self.watermarks.get(watermark_key(search_query, area), ""))
+        if wm is None:
+            return None
+        if wm < datetime.now(timezone.utc) - timedelta(days=period_days):
+            return None
+        return wm.strftime(HH_DATE_FMT)
+
+    def observe(self, item: dict, area) -> None:
+        """Учитывает published_at вакансии в водяном знаке её поискового запроса."""
+        key = watermark_key(item.get("search_query", ""), area)
+        published = parse_published_at(item.get("published_at") or "")
+        if published is None:
+            return
+        current = self._staged.get(key) or parse_published_at(self.watermarks.get(key, ""))
+        if current is None or published > current:
+            self._staged[key] = published
+
+    def mark_failed(self, search_query: str, area) -> None:
+        """
+        Запрос потерял часть вакансий (страница или карточка не скачалась): водяной знак
+        по остальным страницам перепрыгнул бы их, поэтому для запроса он не сохраняется.
+        """
+        self._failed.add(watermark_key(search_query, area))
+
+    def mark_truncated(self, search_query: str, area) -> None:
+        """
+        Поиск нашёл больше вакансий, чем было выкачано страниц: непрочитанный хвост окна
+        оказался бы за водяным знаком, поэтому для запроса он не сохраняется.
+        """
+        self._truncated.add(watermark_key(search_query, area))
+
+    def write_pending(self) -> Dict[str, str]:
+        """
+        Кладёт накопленные через observe() водяные знаки (кроме запросов с ошибками и обрезанных)
+        и публикации из stage_seen() в pending-файлы.
+        """
+        held = self._failed | self._truncated
+        pending = {k: v.strftime(HH_DATE_FMT) for k, v in self._staged.items() if k not in held}
+        if self._failed:
+            print(f"Водяной знак не сдвинут для запросов с ошибками: {len(self._failed)}")
+        if self._truncated:
+            print(f"Водяной знак не сдвинут для обрезанных запросов: {len(self._truncated)}")
+        _atomic_write(self.pending_path, json.dumps(pending, ensure_ascii=False).encode("utf-8"))
+        self._write_listings(self.seen_pending_path, self._staged_seen)
+        return pending
+
+    def stage_watermarks(self, frames: List[dict], area) -> Dict[str, str]:
+        """Считает максимальный published_at по запросам и кладёт его в pending-файл."""
+        for item in frames:
+            self.observe(item, area)
+        return self.write_pending()
+
+    def commit_watermarks(self) -> None:
+        """Переносит pending-водяные знаки в основные после успешной заливки."""
+        pending = self._read_json(self.pending_path)
+        if not pending:
+            return
+        self.watermarks.update(pending)
+        _atomic_write(self.watermarks_path, json.dumps(self.watermarks, ensure_ascii=False, indent=2).encode("utf-8"))
+        os.remove(self.pending_path)
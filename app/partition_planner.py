@@ -0,0 +1,117 @@
+"""
+Планировщик разбиения поиска hh.ru на непересекающиеся срезы.
+
+Поиск hh.ru отдаёт не больше HH_SEARCH_DEPTH вакансий на запрос (page * per_page),
+поэтому широкий запрос режется на срезы по региону, затем пополам по окну
+публикации, а если окно уже минимальное — по профессиональной роли, пока
+каждый срез не уложится в лимит. Срезы по ролям могут пересекаться
+(у вакансии бывает несколько ролей), поэтому результаты надо дедуплицировать.
+"""
+import asyncio
+import math
+import os
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from hh_client import HH_DATE_FMT
+
+HH_SEARCH_DEPTH = int(os.getenv("HH_SEARCH_DEPTH", "2000"))
+HH_MIN_WINDOW_MIN = int(os.getenv("HH_MIN_WINDOW_MIN", "60"))
+PARTITIONED = os.getenv("HH_PARTITIONED", "0").lower() in ("1", "true", "yes")
+
+# params -> JSON ответа /vacancies
+FetchJson = Callable[[Dict], Awaitable[Dict]]
+
+
+@dataclass(frozen=True)
+class SearchSlice:
+    search_query: str
+    area: int
+    date_from: datetime
+    date_to: datetime
+    field: str = "name"
+    professional_role: Optional[str] = None
+    found: int = 0
+
+    def params(self, per_page: int, page: int = 0) -> Dict:
+        params = {
+            "page": page,
+            "per_page": per_page,
+            "text": f"!{self.search_query}",
+            "area": self.area,
+            "date_from": self.date_from.strftime(HH_DATE_FMT),
+            "date_to": self.date_to.strftime(HH_DATE_FMT),
+            "field": self.field,
+            # с date_from выдача по дате, а не по релевантности (см. ingest_state)
+            "order_by": "publication_time",
+        }
+        if self.professional_role:
+            params["professional_role"] = self.professional_role
+        return params
+
+    def pages(self, per_page: int, depth: int = HH_SEARCH_DEPTH) -> int:
+        return math.ceil(min(self.found, depth) / per_page)
+
+    def halves(self) -> List["SearchSlice"]:
+        middle = self.date_from + (self.date_to - self.date_from) / 2
+        return [replace(self, date_to=middle, found=0), replace(self, date_from=middle, found=0)]
+
+
+class PartitionPlanner:
+    def __init__(
+        self,
+        fetch_json: FetchJson,
+        depth: int = HH_SEARCH_DEPTH,
+        min_window: timedelta = timedelta(minutes=HH_MIN_WINDOW_MIN),
+        roles: Optional[List[str]] = None,
+    ):
+        self.fetch_json = fetch_json
+        self.depth = depth
+        self.min_window = min_window
+        self.roles = roles
+        self.truncated: List[SearchSlice] = []
+
+    async def count(self, s: SearchSlice) -> int:
+        data = await self.fetch_json(s.params(per_page=1))
+        return int(data.get("found") or 0)
+
+    async def split(self, s: SearchSlice) -> List[SearchSlice]:
+        """Рекурсивно режет срез, пока found не станет <= depth; пустые срезы отбрасываются."""
+        found = await self.count(s)
+        if found == 0:
+            return []
+        s = replace(s, found=found)
+        if found <= self.depth:
+            return [s]
+        if s.date_to - s.date_from > self.min_window:
+            parts = s.halves()
+        elif s.professional_role is None and self.roles:
+            parts = [replace(s, professional_role=role, found=0) for role in self.roles]
+        else:
+            print(f"    Срез не помещается в лимит hh.ru ({found} > {self.depth}): {s}")
+            self.truncated.append(s)
+            return [s]
+        nested = await asyncio.gather(*(self.split(p) for p in parts))
+        return [x for part in nested for x in part]
+
+    async def plan(
+        self, search_queries, areas, date_from: datetime, date_to: datetime, field: str = "name"
+    ) -> List[SearchSlice]:
+        areas = areas if isinstance(areas, (list, tuple)) else [areas]
+        roots = [
+            SearchSlice(search_query=q, area=a, date_from=date_from, date_to=date_to, field=field)
+            for q in search_queries
+            for a in areas
+        ]
+        nested = await asyncio.gather(*(self.split(r) for r in roots))
+        return [x for part in nested for x in part]
+
+
+def role_ids(dictionary: Dict) -> List[str]:
+    """Уникальные ID ролей из справочника /professional_roles (роль может входить в несколько категорий)."""
+    ids: Dict[str, None] = {}
+    for category in dictionary.get("categories", []):
+        for role in category.get("roles", []):
+            ids.setdefault(str(role["id"]), None)
+    return list(ids)
@@ -0,0 +1,51 @@
+"""
+Проекции payload для scroll/search/retrieve по коллекции вакансий.
+
+Почти весь объём точки — description, а большинству потребителей он не нужен:
+валидатору и бэкфиллу хватает url, кешу фильтров — двух полей, списку
+результатов бота — всего, кроме описания. Каждый потребитель берёт свою
+проекцию, а описание для карточки догружается по ID, только когда карточку
+действительно показывают (load_card()).
+"""
+from typing import Any, Dict
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+# поля с телом вакансии: в списках не передаём, грузим при показе карточки
+CARD_BODY_FIELDS = ["description", "snippet"]
+
+PROJECTIONS: Dict[str, models.PayloadSelector] = {
+    # валидатор, бэкфилл: только ссылка на hh.ru
+    "url": models.PayloadSelectorInclude(include=["url", "alternate_url"]),
+    # кеш фильтров бота
+    "filters": models.PayloadSelectorInclude(include=["professional_roles_name", "area_name"]),
+    # результаты поиска бота: всё, кроме тела вакансии
+    "list": models.PayloadSelectorExclude(exclude=CARD_BODY_FIELDS),
+    "card": models.PayloadSelectorInclude(include=CARD_BODY_FIELDS),
+}
+
+
+def projection(name: str) -> models.PayloadSelector:
+    try:
+        return PROJECTIONS[name]
+    except KeyError:
+        raise ValueError(f"Неизвестная проекция payload: {name!r}") from None
+
+
+def load_card(client: QdrantClient, collection: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Догружает description/snippet в документ из списка результатов (у него есть "id").
+    Повторно не ходит: загруженный документ помечается "card_loaded".
+    """
+    if doc.get("card_loaded") or doc.get("id") is None:
+        return doc
+    points = client.retrieve(
+        collection_name=collection, ids=[doc["id"]], with_payload=projection("card"), with_vectors=False
+    )
+    p = (points[0].payload or {}) if points else {}
+    doc["description"] = p.get("description") or ""
+    doc["snippet"] = p.get("snippet") or ""
+    doc["card_loaded"] = True
+    return doc
+
@@ -0,0 +1,299 @@
+"""Пул бесплатных HTTP-прокси с TTL, статистикой здоровья и фоновым обновлением."""
+import asyncio
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, TypeVar
+
+import httpx
+import requests
+from bs4 import BeautifulSoup
+
+PROXY_LIST_URL = os.getenv("PROXY_LIST_URL", "https://free-proxy-list.net/")
+PROXY_TTL_SEC = float(os.getenv("PROXY_TTL_SEC", "900"))
+PROXY_MAX_FAILURES = int(os.getenv("PROXY_MAX_FAILURES", "3"))
+PROXY_TOP_K = int(os.getenv("PROXY_TOP_K", "10"))
+# для каких схем URL прокси реально подставляется; "http" повторяет прежнее поведение retry_request
+PROXY_SCHEMES = [s.strip() for s in os.getenv("PROXY_SCHEMES", "http").split(",") if s.strip()]
+USE_PROXY_POOL = os.getenv("HH_USE_PROXY", "0").lower() in ("1", "true", "yes")
+
+DEFAULT_LATENCY_SEC = 1.0
+LATENCY_ALPHA = 0.3
+
+T = TypeVar("T")
+
+
+def parse_proxy_table(html: str) -> List[str]:
+    """Достаёт прокси вида http://ip:port из HTML-таблицы free-proxy-list."""
+    soup = BeautifulSoup(html, "html.parser")
+    table = soup.find("table", {"class": "table table-striped table-bordered"})
+    proxies: List[str] = []
+    if table is None:
+        return proxies
+    for row in table.find_all("tr")[1:]:
+        columns = row.find_all("td")
+        if len(columns) >= 2:
+            ip = columns[0].text.strip()
+            port = columns[1].text.strip()
+            if ip and port:
+                proxies.append(f"http://{ip}:{port}")
+    return proxies
+
+
+def fetch_proxy_list(url: str = PROXY_LIST_URL, timeout: float = 20) -> List[str]:
+    response = requests.get(url, timeout=timeout)
+    response.raise_for_status()
+    return parse_proxy_table(response.text)
+
+
+@dataclass
+class ProxyStats:
+    proxy: str
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    latency: Optional[float] = None
+
+    @property
+    def success_rate(self) -> float:
+        # сглаживание Лапласа: новый прокси стартует с 0.5, а не с 0 или 1
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+    @property
+    def score(self) -> float:
+        latency = self.latency if self.latency is not None else DEFAULT_LATENCY_SEC
+        return self.success_rate / max(latency, 0.05)
+
+
+class ProxyPool:
+    """
+    Загружает список прокси один раз на ttl секунд и выбирает быстрые и живые.
+    Прокси с max_failures подряд неудачами выкидываются до следующего обновления списка.
+    """
+
+    def __init__(
+        self,
+        source_url: str = PROXY_LIST_URL,
+        ttl: float = PROXY_TTL_SEC,
+        max_failures: int = PROXY_MAX_FAILURES,
+        top_k: int = PROXY_TOP_K,
+        loader: Optional[Callable[[str], List[str]]] = None,
+    ):
+        self.source_url = source_url
+        self.ttl = ttl
+        self.max_failures = max_failures
+        self.top_k = top_k
+        self._loader = loader or fetch_proxy_list
+        self._stats: Dict[str, ProxyStats] = {}
+        self._dead: set = set()
+        self._loaded_at: Optional[float] = None
+        # первая загрузка списка завершилась (успешно или нет)
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._clients: Dict[str, httpx.Client] = {}
+        self._async_clients: Dict[str, httpx.AsyncClient] = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._stats)
+
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl
+
+    def refresh(self, force: bool = False) -> int:
+        """Перечитывает список прокси; при ошибке загрузки оставляет текущий."""
+        with self._refresh_lock:
+            if not force and not self.is_stale():
+                return len(self)
+            try:
+                proxies = self._loader(self.source_url)
+            except Exception as e:
+                print(f"Не удалось обновить список прокси: {e}")
+                with self._lock:
+                    if self._loaded_at is None:
+                        self._loaded_at = time.monotonic()
+                    self._ready.set()
+                    return len(self._stats)
+            with self._lock:
+                # статистику по уже знакомым прокси сохраняем, мёртвым даём второй шанс
+                self._stats = {p: self._stats.get(p) or ProxyStats(p) for p in proxies}
+                for st in self._stats.values():
+                    st.consecutive_failures = 0
+                self._dead.clear()
+                self._loaded_at = time.monotonic()
+                self._ready.set()
+                return len(self._stats)
+
+    def get(self) -> Optional[str]:
+        """Случайный прокси из top_k лучших по score; None, если пул пуст."""
+        if self._thread is not None:
+            self._ready.wait()
+        elif self.is_stale():
+            self.refresh()
+        with self._lock:
+            alive = [st for st in self._stats.values() if st.proxy not in self._dead]
+            if not alive:
+                return None
+            best = sorted(alive, key=lambda st: st.score, reverse=True)[: max(1, self.top_k)]
+            return random.choices(best, weights=[st.score for st in best], k=1)[0].proxy
+
+    async def aget(self) -> Optional[str]:
+        """get() для asyncio: загрузка списка и ожидание первой загрузки идут в потоке, а не в цикле событий."""
+        loop = asyncio.get_running_loop()
+        if self._thread is None:
+            if self.is_stale():
+                await loop.run_in_executor(None, self.refresh)
+        elif not self._ready.is_set():
+            await loop.run_in_executor(None, self._ready.wait)
+        return self.get()
+
+    def report_success(self, proxy: Optional[str], latency: float) -> None:
+        if not proxy:
+            return
+        with self._lock:
+            st = self._stats.get(proxy)
+            if st is None:
+                return
+            st.successes += 1
+            st.consecutive_failures = 0
+            st.latency = latency if st.latency is None else (
+                LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * st.latency
+            )
+
+    def report_failure(self, proxy: Optional[str]) -> None:
+        if not proxy:
+            return
+        with self._lock:
+            st = self._stats.get(proxy)
+            if st is None:
+                return
+            st.failures += 1
+            st.consecutive_failures += 1
+            if st.consecutive_failures >= self.max_failures:
+                self._dead.add(proxy)
+
+    def call(self, fn: Callable[[Optional[str]], T]) -> T:
+        """Вызывает fn(proxy) и учитывает результат и задержку в статистике прокси."""
+        proxy = self.get()
+        started = time.monotonic()
+        try:
+            result = fn(proxy)
+        except Exception:
+            self.report_failure(proxy)
+            raise
+        self.report_success(proxy, time.monotonic() - started)
+        return result
+
+    def requests_proxies(self, proxy: Optional[str]) -> Dict[str, str]:
+        """Словарь proxies для requests с учётом PROXY_SCHEMES."""
+        if not proxy:
+            return {}
+        return {scheme: proxy for scheme in PROXY_SCHEMES}
+
+    def httpx_client(self, proxy: Optional[str], **kwargs) -> httpx.Client:
+        """Переиспользуемый httpx.Client для конкретного прокси (None — без прокси)."""
+        key = proxy or ""
+        with self._lock:
+            hc = self._clients.get(key)
+            if hc is None:
+                mounts = {f"{s}://": httpx.HTTPTransport(proxy=proxy) for s in PROXY_SCHEMES} if proxy else None
+                hc = httpx.Client(mounts=mounts, **kwargs)
+                self._clients[key] = hc
+            return hc
+
+    def async_httpx_client(self, proxy: Optional[str], **kwargs) -> httpx.AsyncClient:
+        """То же для asyncio; клиенты привязаны к циклу событий, закрывать через aclose_async_clients()."""
+        key = proxy or ""
+        with self._lock:
+            hc = self._async_clients.get(key)
+            if hc is None:
+                mounts = {f"{s}://": httpx.AsyncHTTPTransport(proxy=proxy) for s in PROXY_SCHEMES} if proxy else None
+                hc = httpx.AsyncClient(mounts=mounts, **kwargs)
+                self._async_clients[key] = hc
+            return hc
+
+    async def aclose_async_clients(self) -> None:
+        with self._lock:
+            clients, self._async_clients = list(self._async_clients.values()), {}
+        for hc in clients:
+            await hc.aclose()
+
+    def start_background_refresh(self) -> None:
+        """Обновляет список в фоне по истечении TTL, чтобы get() ждал сеть только до первой загрузки."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name="proxy-pool-refresh", daemon=True)
+        self._thread.start()
+
+    def _refresh_loop(self) -> None:
+        self.refresh()
+        while not self._stop.wait(max(1.0, self.ttl)):
+            self.refresh(force=True)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for hc in clients:
+            hc.close()
+
+
+_POOL: Optional[ProxyPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool() -> ProxyPool:
+    """Общий пул на процесс; с HH_USE_PROXY список прокси обновляется в фоновом потоке."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ProxyPool()
+            if USE_PROXY_POOL:
+                _POOL.start_background_refresh()
+        return _POOL
+
+
+def _check_proxy_response(r: httpx.Response) -> httpx.Response:
+    # 407 и 5xx чаще всего означают сломанный прокси, а не ответ hh.ru
+    if r.status_code == 407 or r.status_code >= 500:
+        r.raise_for_status()
+    return r
+
+
+def pooled_get(hc: httpx.Client, url: str, params=None, headers=None) -> httpx.Response:
+    """GET через общий пул прокси, если включён HH_USE_PROXY, иначе напрямую через hc."""
+    if not USE_PROXY_POOL:
+        return hc.get(url, params=params, headers=headers)
+    pool = get_pool()
+
+    def send(proxy: Optional[str]) -> httpx.Response:
+        client = pool.httpx_client(proxy, timeout=hc.timeout, headers=hc.headers) if proxy else hc
+        return _check_proxy_response(client.get(url, params=params, headers=headers))
+
+    return pool.call(send)
+
+
+async def async_pooled_get(hc: httpx.AsyncClient, url: str, params=None, headers=None) -> httpx.Response:
+    """Асинхронный pooled_get."""
+    if not USE_PROXY_POOL:
+        return await hc.get(url, params=params, headers=headers)
+    pool = get_pool()
+    proxy = await pool.aget()
+    client = pool.async_httpx_client(proxy, timeout=hc.timeout, headers=hc.headers) if proxy else hc
+    started = time.monotonic()
+    try:
+        r = _check_proxy_response(await client.get(url, params=params, headers=headers))
+    except Exception:
+        pool.report_failure(proxy)
+        raise
+    pool.report_success(proxy, time.monotonic() - started)
+    return r
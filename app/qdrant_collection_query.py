@@ -1,7 +1,7 @@
 from qdrant_client import QdrantClient
 import os
 from make_short_card import make_short_card_embed
-from sentence_transformers import SentenceTransformer
+from embed_pool import load_encoder
 
 QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_COLLECTION = os.getenv("QDRANT_COLLECTION")
@@ -29,7 +29,7 @@ for p in points:
         "url": payload.get("url"),
     })
 
-model = SentenceTransformer(MODEL_DIR if MODEL_DIR else EMBED_MODEL)
+model = load_encoder(MODEL_DIR if MODEL_DIR else EMBED_MODEL, workers=1)
 
 for vac in vacancies:
     text, debug = make_short_card_embed(vac, model)
@@ -0,0 +1,146 @@
+"""
+Создание и донастройка коллекции вакансий в Qdrant.
+
+Бот фильтрует каждый запрос по is_active, professional_roles_name и area_name,
+валидатор — по archived, archived_checked_at и first_seen_at, бэкфилл —
+по enrich_version, поэтому на эти поля заводятся payload-индексы.
+Параметры HNSW, scalar-квантизация (исходные векторы на диске) и payload
+на диске задаются через окружение. ensure_collection() (её вызывает
+загрузчик) создаёт коллекцию с этими настройками, а у существующей только
+дозаводит недостающие payload-индексы. HNSW, квантизация и payload на диске
+у существующей коллекции меняются лишь явной миграцией, потому что Qdrant
+при этом перестраивает индекс: python qdrant_schema.py.
+"""
+import os
+from typing import Dict, List, Optional
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+QDRANT_URL = os.getenv("QDRANT_URL")
+QDRANT_COLLECTION = os.getenv("QDRANT_COLLECTION")
+
+QDRANT_HNSW_M = int(os.getenv("QDRANT_HNSW_M", "16"))
+QDRANT_HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "128"))
+QDRANT_SEARCH_EF = int(os.getenv("QDRANT_SEARCH_EF", "128"))
+QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "0").lower() in ("1", "true", "yes")
+QDRANT_QUANTILE = float(os.getenv("QDRANT_QUANTILE", "0.99"))
+QDRANT_ON_DISK_PAYLOAD = os.getenv("QDRANT_ON_DISK_PAYLOAD", "1").lower() in ("1", "true", "yes")
+
+PAYLOAD_INDEXES: Dict[str, models.PayloadSchemaType] = {
+    "is_active": models.PayloadSchemaType.BOOL,
+    "archived": models.PayloadSchemaType.BOOL,
+    "professional_roles_name": models.PayloadSchemaType.KEYWORD,
+    "area_name": models.PayloadSchemaType.KEYWORD,
+    "archived_checked_at": models.PayloadSchemaType.DATETIME,
+    "first_seen_at": models.PayloadSchemaType.DATETIME,
+    "enrich_version": models.PayloadSchemaType.INTEGER,
+}
+
+
+def hnsw_config() -> models.HnswConfigDiff:
+    return models.HnswConfigDiff(m=QDRANT_HNSW_M, ef_construct=QDRANT_HNSW_EF_CONSTRUCT)
+
+
+def quantization_config() -> Optional[models.ScalarQuantization]:
+    if not QDRANT_QUANTIZATION:
+        return None
+    return models.ScalarQuantization(
+        scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=QDRANT_QUANTILE, always_ram=True)
+    )
+
+
+def search_params() -> models.SearchParams:
+    """Параметры поиска для бота: ef и, при квантизации, пересчёт top по исходным векторам."""
+    quantization = models.QuantizationSearchParams(rescore=True) if QDRANT_QUANTIZATION else None
+    return models.SearchParams(hnsw_ef=QDRANT_SEARCH_EF, quantization=quantization)
+
+
+def ensure_payload_indexes(client: QdrantClient, collection: str, existing: Optional[dict] = None) -> List[str]:
+    existing = existing or {}
+    created = []
+    for field_name, schema in PAYLOAD_INDEXES.items():
+        if field_name in existing:
+            continue
+        client.create_payload_index(collection_name=collection, field_name=field_name, field_schema=schema, wait=True)
+        created.append(field_name)
+    return created
+
+
+def create_collection(client: QdrantClient, collection: str, dim: int) -> None:
+    quantization = quantization_config()
+    client.create_collection(
+        collection_name=collection,
+        vectors_config=models.VectorParams(
+            size=dim,
+            distance=models.Distance.COSINE,
+            # при квантизации в памяти держим int8-копию, исходные векторы — на диске
+            on_disk=True if quantization else None,
+        ),
+        hnsw_config=hnsw_config(),
+        quantization_config=quantization,
+        on_disk_payload=QDRANT_ON_DISK_PAYLOAD,
+    )
+    ensure_payload_indexes(client, collection)
+
+
+def migrate_collection(client: QdrantClient, collection: str) -> List[str]:
+    """
+    Доводит существующую коллекцию до текущих настроек на месте (Qdrant
+    перестраивает сегменты в фоне). Возвращает список сделанных изменений.
+    """
+    info = client.get_collection(collection)
+    config = info.config
+    changes: List[str] = []
+
+    hnsw = config.hnsw_config
+    if hnsw.m != QDRANT_HNSW_M or hnsw.ef_construct != QDRANT_HNSW_EF_CONSTRUCT:
+        client.update_collection(collection_name=collection, hnsw_config=hnsw_config())
+        changes.append(f"hnsw m={QDRANT_HNSW_M} ef_construct={QDRANT_HNSW_EF_CONSTRUCT}")
+
+    quantization = quantization_config()
+    if quantization is not None and config.quantization_config is None:
+        client.update_collection(
+            collection_name=collection,
+            quantization_config=quantization,
+            vectors_config={"": models.VectorParamsDiff(on_disk=True)},
+        )
+        changes.append("scalar int8 quantization, vectors on disk")
+    elif quantization is None and config.quantization_config is not None:
+        client.update_collection(collection_name=collection, quantization_config=models.Disabled.DISABLED)
+        changes.append("quantization disabled")
+
+    if bool(config.params.on_disk_payload) != QDRANT_ON_DISK_PAYLOAD:
+        client.update_collection(
+            collection_name=collection,
+            collection_params=models.CollectionParamsDiff(on_disk_payload=QDRANT_ON_DISK_PAYLOAD),
+        )
+        changes.append(f"on_disk_payload={QDRANT_ON_DISK_PAYLOAD}")
+
+    created = ensure_payload_indexes(client, collection, info.payload_schema)
+    if created:
+        changes.append("payload indexes: " + ", ".join(created))
+    return changes
+
+
+def ensure_collection(client: QdrantClient, collection: str, dim: int) -> None:
+    if not client.collection_exists(collection):
+        create_collection(client, collection, dim)
+        print(f"Создана коллекция '{collection}' (dim={dim})")
+        return
+    created = ensure_payload_indexes(client, collection, client.get_collection(collection).payload_schema)
+    if created:
+        print(f"Коллекция '{collection}': payload indexes: {', '.join(created)}")
+
+
+def main():
+    client = QdrantClient(url=QDRANT_URL, prefer_grpc=False)
+    changes = migrate_collection(client, QDRANT_COLLECTION)
+    for change in changes:
+        print(f"✅ {change}")
+    if not changes:
+        print(f"Коллекция '{QDRANT_COLLECTION}' уже настроена")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Общий адаптивный ограничитель частоты запросов к hh.ru.
+
+Token bucket, скорость которого подстраивается по AIMD: каждый успешный
+ответ понемногу прибавляет скорость, 429/5xx и сетевые ошибки делят её
+пополам. Retry-After от сервера ставит на паузу всех клиентов процесса,
+повторы идут с экспоненциальной задержкой и джиттером.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Optional, Tuple, Type, TypeVar
+
+import httpx
+
+HH_RATE_RPS = float(os.getenv("HH_RATE_RPS", "4"))
+HH_RATE_MIN_RPS = float(os.getenv("HH_RATE_MIN_RPS", "0.5"))
+HH_RATE_MAX_RPS = float(os.getenv("HH_RATE_MAX_RPS", "20"))
+HH_RATE_BURST = float(os.getenv("HH_RATE_BURST", "4"))
+HH_RATE_INCREASE = float(os.getenv("HH_RATE_INCREASE", "0.5"))
+HH_RATE_DECREASE = float(os.getenv("HH_RATE_DECREASE", "0.5"))
+HH_MAX_RETRIES = int(os.getenv("HH_MAX_RETRIES", "5"))
+HH_BACKOFF_BASE = float(os.getenv("HH_BACKOFF_BASE", "1"))
+HH_BACKOFF_MAX = float(os.getenv("HH_BACKOFF_MAX", "60"))
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+R = TypeVar("R")
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After в секундах: число секунд или HTTP-дата."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None, base: float = HH_BACKOFF_BASE) -> float:
+    """Задержка перед повтором: Retry-After, если есть, иначе base * 2^attempt с джиттером."""
+    if retry_after is not None:
+        return min(retry_after, HH_BACKOFF_MAX)
+    cap = min(HH_BACKOFF_MAX, base * (2 ** attempt))
+    return random.uniform(cap / 2, cap)
+
+
+class AdaptiveRateLimiter:
+    def __init__(
+        self,
+        rate: float = HH_RATE_RPS,
+        min_rate: float = HH_RATE_MIN_RPS,
+        max_rate: float = HH_RATE_MAX_RPS,
+        burst: float = HH_RATE_BURST,
+        increase: float = HH_RATE_INCREASE,
+        decrease: float = HH_RATE_DECREASE,
+    ):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = max(1.0, burst)
+        self.increase = increase
+        self.decrease = decrease
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Резервирует токен и возвращает, сколько секунд ждать до его появления."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+            return max(wait, self._paused_until - now)
+
+    def acquire(self) -> None:
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self) -> None:
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def on_success(self) -> None:
+        with self._lock:
+            # +increase rps примерно за секунду успешных ответов
+            self.rate = min(self.max_rate, self.rate + self.increase / max(self.rate, 1.0))
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._tokens = min(self._tokens, 0.0)
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+
+_LIMITER: Optional[AdaptiveRateLimiter] = None
+_LIMITER_LOCK = threading.Lock()
+
+
+def get_limiter() -> AdaptiveRateLimiter:
+    """Общий ограничитель на процесс для всех запросов к hh.ru."""
+    global _LIMITER
+    with _LIMITER_LOCK:
+        if _LIMITER is None:
+            _LIMITER = AdaptiveRateLimiter()
+        return _LIMITER
+
+
+def _retry_after(response) -> Optional[float]:
+    return parse_retry_after(response.headers.get("Retry-After"))
+
+
+def request_with_retries(
+    send: Callable[[], R],
+    limiter: Optional[AdaptiveRateLimiter] = None,
+    retries: int = HH_MAX_RETRIES,
+    base_delay: float = HH_BACKOFF_BASE,
+    retry_on: Tuple[Type[BaseException], ...] = (httpx.TransportError, httpx.HTTPStatusError),
+) -> R:
+    """
+    Вызывает send() под ограничителем. 429/5xx и исключения из retry_on повторяются;
+    после последней попытки возвращается последний ответ (или пробрасывается исключение).
+    """
+    limiter = limiter or get_limiter()
+    for attempt in range(retries):
+        limiter.acquire()
+        try:
+            response = send()
+        except retry_on as e:
+            limiter.on_throttle()
+            if attempt == retries - 1:
+                print(f"Максимальное количество попыток достигнуто: {e}")
+                raise
+            delay = backoff_delay(attempt, base=base_delay)
+            print(f"Ошибка запроса: {e}. Попытка {attempt + 1} из {retries}. Повтор через {delay:.1f} секунд...")
+            time.sleep(delay)
+            continue
+        if response.status_code not in RETRYABLE_STATUSES:
+            limiter.on_success()
+            return response
+        retry_after = _retry_after(response)
+        limiter.on_throttle(retry_after)
+        if attempt == retries - 1:
+            return response
+        delay = backoff_delay(attempt, retry_after, base=base_delay)
+        print(f"HTTP {response.status_code}. Попытка {attempt + 1} из {retries}. Повтор через {delay:.1f} секунд...")
+        time.sleep(delay)
+    raise RuntimeError("retries must be >= 1")
+
+
+async def arequest_with_retries(
+    send: Callable[[], Awaitable[R]],
+    limiter: Optional[AdaptiveRateLimiter] = None,
+    retries: int = HH_MAX_RETRIES,
+    base_delay: float = HH_BACKOFF_BASE,
+    retry_on: Tuple[Type[BaseException], ...] = (httpx.TransportError, httpx.HTTPStatusError),
+) -> R:
+    """Асинхронный request_with_retries."""
+    limiter = limiter or get_limiter()
+    for attempt in range(retries):
+        await limiter.aacquire()
+        try:
+            response = await send()
+        except retry_on as e:
+            limiter.on_throttle()
+            if attempt == retries - 1:
+                print(f"Максимальное количество попыток достигнуто: {e}")
+                raise
+            delay = backoff_delay(attempt, base=base_delay)
+            print(f"Ошибка запроса: {e}. Попытка {attempt + 1} из {retries}. Повтор через {delay:.1f} секунд...")
+            await asyncio.sleep(delay)
+            continue
+        if response.status_code not in RETRYABLE_STATUSES:
+            limiter.on_success()
+            return response
+        retry_after = _retry_after(response)
+        limiter.on_throttle(retry_after)
+        if attempt == retries - 1:
+            return response
+        delay = backoff_delay(attempt, retry_after, base=base_delay)
+        print(f"HTTP {response.status_code}. Попытка {attempt + 1} из {retries}. Повтор через {delay:.1f} секунд...")
+        await asyncio.sleep(delay)
+    raise RuntimeError("retries must be >= 1")
@@ -0,0 +1,91 @@
+"""
+Расписание перепроверки вакансий валидатором.
+
+Вместо обхода всей коллекции валидатор берёт только «созревшие» точки —
+те, чей archived_checked_at старше интервала их уровня. Уровни задаются по
+возрасту вакансии (first_seen_at): свежие закрываются редко и проверяются
+раз в несколько дней, старые — чаще; архивные — раз в неделю или никогда.
+Уровни обходятся по приоритету, пока не исчерпан бюджет запросов к hh.ru
+на запуск, так что стоимость прогона — O(бюджета), а не O(коллекции).
+Точки без first_seen_at (залиты до появления поля) считаются старыми,
+без archived_checked_at — ни разу не проверенными, то есть созревшими.
+"""
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    DatetimeRange,
+    FieldCondition,
+    Filter,
+    IsEmptyCondition,
+    MatchValue,
+    PayloadField,
+)
+
+# запросов к hh.ru за запуск, 0 — без ограничения
+BUDGET = int(os.getenv("VALIDATOR_BUDGET", "5000"))
+FRESH_DAYS = float(os.getenv("VALIDATOR_FRESH_DAYS", "3"))
+OLD_DAYS = float(os.getenv("VALIDATOR_OLD_DAYS", "14"))
+RECHECK_FRESH_HOURS = float(os.getenv("VALIDATOR_RECHECK_FRESH_HOURS", "72"))
+RECHECK_AGING_HOURS = float(os.getenv("VALIDATOR_RECHECK_AGING_HOURS", "24"))
+RECHECK_OLD_HOURS = float(os.getenv("VALIDATOR_RECHECK_OLD_HOURS", "12"))
+# 0 — архивные не перепроверяем
+RECHECK_ARCHIVED_HOURS = float(os.getenv("VALIDATOR_RECHECK_ARCHIVED_HOURS", "168"))
+
+
+@dataclass(frozen=True)
+class Tier:
+    """Уровень перепроверки: вакансии возрастом [min_age_days, max_age_days)."""
+
+    name: str
+    recheck_hours: float
+    archived: bool = False
+    min_age_days: Optional[float] = None
+    max_age_days: Optional[float] = None
+
+    def due_filter(self, now: datetime) -> Filter:
+        must = []
+        must_not = [
+            FieldCondition(key="archived_checked_at", range=DatetimeRange(gte=now - timedelta(hours=self.recheck_hours)))
+        ]
+        if self.archived:
+            must.append(FieldCondition(key="archived", match=MatchValue(value=True)))
+        else:
+            # is_active/archived могли не записаться у старых точек — считаем их активными
+            must_not.append(FieldCondition(key="archived", match=MatchValue(value=True)))
+
+        if self.min_age_days is not None or self.max_age_days is not None:
+            first_seen = DatetimeRange(
+                lte=now - timedelta(days=self.min_age_days) if self.min_age_days is not None else None,
+                gt=now - timedelta(days=self.max_age_days) if self.max_age_days is not None else None,
+            )
+            age = FieldCondition(key="first_seen_at", range=first_seen)
+            if self.max_age_days is None:
+                # у самых старых уровней без first_seen_at — точки, залитые до появления поля
+                must.append(Filter(should=[age, IsEmptyCondition(is_empty=PayloadField(key="first_seen_at"))]))
+            else:
+                must.append(age)
+        return Filter(must=must or None, must_not=must_not)
+
+
+def default_tiers() -> List[Tier]:
+    """Уровни в порядке приоритета: старые активные вакансии закрываются чаще всего."""
+    tiers = [
+        Tier("old", RECHECK_OLD_HOURS, min_age_days=OLD_DAYS),
+        Tier("aging", RECHECK_AGING_HOURS, min_age_days=FRESH_DAYS, max_age_days=OLD_DAYS),
+        Tier("fresh", RECHECK_FRESH_HOURS, max_age_days=FRESH_DAYS),
+    ]
+    if RECHECK_ARCHIVED_HOURS > 0:
+        tiers.append(Tier("archived", RECHECK_ARCHIVED_HOURS, archived=True))
+    return tiers
+
+
+def count_due(client: QdrantClient, collection: str, tiers: List[Tier], now: datetime) -> List[int]:
+    """Сколько точек созрело на каждом уровне (по payload-индексам, без обхода)."""
+    return [
+        client.count(collection_name=collection, count_filter=tier.due_filter(now), exact=True).count
+        for tier in tiers
+    ]
@@ -2,7 +2,6 @@ import os
 import logging
 from typing import Dict, List, Any, Optional, Set
 
-from sentence_transformers import SentenceTransformer
 from qdrant_client import QdrantClient
 from qdrant_client.models import Filter, FieldCondition, MatchValue
 
@@ -25,7 +24,11 @@ from telegram.ext import (
 
 from prometheus_client import start_http_server, Counter, Gauge
 
+from embed_pool import encoder_name, load_encoder
+from embedding_cache import encode_cached, get_embedding_cache
 from make_short_card import make_short_card_embed
+from payload_projection import load_card, projection
+from qdrant_schema import search_params
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("jobradar-bot")
@@ -36,7 +39,12 @@ TG_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 EMBED_MODEL = os.getenv("EMBED_MODEL")
 MODEL_DIR = os.getenv("MODEL_DIR")
 
-model = SentenceTransformer(MODEL_DIR if MODEL_DIR else EMBED_MODEL)
+# один запрос за раз: пул процессов не нужен; EMBED_TORCH_THREADS и EMBED_PRECISION действуют
+model = load_encoder(MODEL_DIR if MODEL_DIR else EMBED_MODEL, workers=1)
+# частые запросы («python», «аналитик данных») не кодируем повторно
+query_cache = get_embedding_cache(
+    encoder_name(MODEL_DIR if MODEL_DIR else EMBED_MODEL), model.get_sentence_embedding_dimension()
+)
 qdrant = QdrantClient(url=QDRANT_URL, prefer_grpc=False)
 
 # === Метрики Prometheus ===
@@ -78,7 +86,7 @@ def refresh_filters_cache(limit_points: int = 20000) -> None:
             collection_name=QDRANT_COLLECTION,
             limit=256,
             offset=offset,
-            with_payload=True,
+            with_payload=projection("filters"),
             with_vectors=False,
             scroll_filter=active_filter(),
         )
@@ -141,16 +149,25 @@ def build_nav_kb(idx: int, total: int, url: str) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(rows)
 
 
+def render_card(doc: Dict[str, Any]) -> str:
+    """Текст карточки; description подтягивается из Qdrant при первом показе."""
+    load_card(qdrant, QDRANT_COLLECTION, doc)
+    card_text, _debug = make_short_card_embed(doc, model)
+    return card_text
+
+
 def retrieve(query: str, k: int = 5, fetch: int = 50) -> List[Dict[str, Any]]:
-    vec = model.encode([query], normalize_embeddings=True)[0].tolist()
+    vec = encode_cached(model, [query], query_cache)[0].tolist()
 
     hits = qdrant.query_points(
         collection_name=QDRANT_COLLECTION,
         query=vec,
         limit=fetch,
-        with_payload=True,
+        # описание догружается в render_card() только для показанных карточек
+        with_payload=projection("list"),
         with_vectors=False,
         query_filter=active_filter(),
+        search_params=search_params(),
     ).points
 
     
@@ -199,7 +216,7 @@ def retrieve_by_filters(role: Optional[str], area: Optional[str], limit: int = 4
     points, _ = qdrant.scroll(
         collection_name=QDRANT_COLLECTION,
         limit=limit,
-        with_payload=True,
+        with_payload=projection("list"),
         with_vectors=False,
         scroll_filter=flt,
     )
@@ -339,7 +356,7 @@ async def on_filters_callback(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
             ctx.user_data["idx"] = 0
 
             doc0 = ctx.user_data["results"][0]
-            card_text, _debug = make_short_card_embed(doc0, model)
+            card_text = render_card(doc0)
             kb = build_nav_kb(0, len(ctx.user_data["results"]), doc0.get("url", ""))
 
             await q.edit_message_text(
@@ -379,7 +396,7 @@ async def on_nav(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     ctx.user_data["idx"] = idx
     doc = docs[idx]
 
-    card_text, _debug = make_short_card_embed(doc, model)
+    card_text = render_card(doc)
     kb = build_nav_kb(idx, total, doc.get("url", ""))
 
     await q.edit_message_text(
@@ -429,7 +446,7 @@ async def on_message(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     ctx.user_data["idx"] = 0
 
     doc0 = docs[0]
-    card_text, _debug = make_short_card_embed(doc0, model)
+    card_text = render_card(doc0)
     kb = build_nav_kb(0, len(docs), doc0.get("url", ""))
 
     await update.message.reply_text(
@@ -0,0 +1,62 @@
+"""
+Контрольная точка длинного обхода коллекции (валидатор, бэкфилл).
+
+После каждой записи обновлений в Qdrant в JSON-файл сохраняется позиция
+обхода — уровень плана и offset страницы, все точки до которой уже
+обработаны и записаны, — вместе со счётчиками и временем запуска. Если задачу
+Airflow перезапускают после падения, обход продолжается с этой позиции, а не
+с первой точки. Повтор уже обработанных точек безопасен: set_payload
+идемпотентен, поэтому позиция может отставать на несколько страниц.
+
+Файл удаляется после успешного завершения; файл старше
+SCROLL_CHECKPOINT_MAX_AGE_HOURS или от другого плана обхода игнорируется.
+Для воркеров Airflow без общего диска SCROLL_CHECKPOINT_DIR должен указывать
+на общий том.
+"""
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+SCROLL_CHECKPOINT_DIR = os.getenv(
+    "SCROLL_CHECKPOINT_DIR", os.path.join(tempfile.gettempdir(), "jobradar", "checkpoints")
+)
+SCROLL_CHECKPOINT_ENABLED = os.getenv("SCROLL_CHECKPOINT_ENABLED", "1").lower() in ("1", "true", "yes")
+SCROLL_CHECKPOINT_MAX_AGE_HOURS = float(os.getenv("SCROLL_CHECKPOINT_MAX_AGE_HOURS", "12"))
+
+
+class ScrollCheckpoint:
+    def __init__(self, job: str, state_dir: str = SCROLL_CHECKPOINT_DIR):
+        self.path = os.path.join(state_dir, f"{job}.json")
+
+    def load(self, plan: List[str]) -> Optional[Dict[str, Any]]:
+        """Состояние прерванного прогона с тем же планом или None."""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+            started = datetime.fromisoformat(state["now"])
+        except (OSError, ValueError, KeyError):
+            return None
+        if state.get("plan") != plan:
+            return None
+        if started < datetime.now(timezone.utc) - timedelta(hours=SCROLL_CHECKPOINT_MAX_AGE_HOURS):
+            return None
+        return state
+
+    def save(self, state: Dict[str, Any]) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def get_checkpoint(job: str) -> Optional[ScrollCheckpoint]:
+    return ScrollCheckpoint(job) if SCROLL_CHECKPOINT_ENABLED else None
@@ -1,102 +1,312 @@
 from pathlib import Path
 import os
-import math
 import pandas as pd
 import uuid
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
-from sentence_transformers import SentenceTransformer
 from tqdm import tqdm
-import gc
 import hashlib
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from embed_pool import encoder_name, load_encoder
+from embedding_cache import encode_cached, get_embedding_cache
+from enrichment import VERSION_FIELD
+from handoff import HASH_COLUMN, read_vacancies, row_hashes
+from ingest_state import INCREMENTAL, IngestState
+from qdrant_schema import ensure_collection
 
 
 SAVE_VACANCIES_AIRFLOW_PATH = os.getenv("SAVE_VACANCIES_AIRFLOW_PATH")
 QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_COLLECTION = os.getenv("QDRANT_COLLECTION")
 EMBED_MODEL = os.getenv("EMBED_MODEL")
-BATCH_SIZE = 2
+# EMBED_MODEL с учётом EMBED_PRECISION: ключ кеша эмбеддингов и часть content_hash
+ENCODER_NAME = encoder_name(EMBED_MODEL or "")
+# строк на один проход encode; внутри чанка батчи собирает encode_dynamic
+BATCH_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", "1024"))
+# точек в одном запросе к Qdrant и число параллельных писателей
+UPSERT_BATCH = int(os.getenv("UPLOAD_UPSERT_BATCH", "256"))
+UPLOAD_WRITERS = int(os.getenv("UPLOAD_WRITERS", "4"))
 
-def main():
+PAYLOAD_COLUMNS = ["title", "company", "professional_roles_name", "experience", "description", "url", "area_name"]
+# что читаем из уже залитых точек, чтобы не перезаписывать их вслепую
+LIFECYCLE_FIELDS = ["content_hash", "is_active", "archived", "first_seen_at", "archived_checked_at"]
+# поля, которые дописывают валидатор и бэкфилл (enrichment): upsert заменяет payload целиком,
+# поэтому у изменившейся вакансии их переносим в новый payload
+ENRICHED_FIELDS = [VERSION_FIELD, "key_skills", "salary_text", "professional_roles_name", "area_name"]
 
-    df = pd.read_csv(SAVE_VACANCIES_AIRFLOW_PATH)
-    for col in ["title","professional_roles_name", "company","experience", "description", "url","area_name"]: #"schedule_name"
-        if col not in df.columns:
-            df[col] = ""
 
-    model = SentenceTransformer(EMBED_MODEL)
-    dim = model.get_sentence_embedding_dimension()
+@dataclass
+class Chunk:
+    ids: List[str]
+    payloads: List[dict]
+    texts: List[str]
+    hashes: List[str]
+    # точки, которые уже лежат в Qdrant с тем же content_hash: вектор и поля не трогаем,
+    # только set_payload с полями жизненного цикла; ключ — этот payload в виде кортежа
+    unchanged: Dict[tuple, List[str]] = field(default_factory=dict)
 
-    client = QdrantClient(url=QDRANT_URL)
+    @property
+    def unchanged_count(self) -> int:
+        return sum(len(ids) for ids in self.unchanged.values())
 
-    try:
-        client.get_collection(QDRANT_COLLECTION)
-    except Exception:
-        client.create_collection(
-            collection_name=QDRANT_COLLECTION,
-            vectors_config=models.VectorParams(size=dim, distance=models.Distance.COSINE),
+
+def point_ids(df: pd.DataFrame) -> List[str]:
+    """
+    Детерминированные ID точек:
+    - основной ключ: url (для hh.ru содержит vacancy/<id>)
+    - fallback: title + company (если url пустой)
+    """
+    url = df["url"].fillna("").astype(str).str.strip()
+    title = df["title"].fillna("").astype(str).str.strip().str.lower()
+    company = df["company"].fillna("").astype(str).str.strip().str.lower()
+    keys = url.where(url != "", title + "::" + company)
+    return [hashlib.md5(k.encode("utf-8")).hexdigest() for k in keys]
+
+
+def content_hashes(df: pd.DataFrame, model_name: Optional[str] = ENCODER_NAME) -> List[str]:
+    """
+    Хеш полей вакансии и модели: совпал — ни вектор, ни payload перезаписывать не нужно.
+    Хеш полей берётся из колонки row_hash файла парсера, если она есть.
+    """
+    if HASH_COLUMN in df.columns and df[HASH_COLUMN].notna().all():
+        rows = df[HASH_COLUMN].tolist()
+    else:
+        rows = row_hashes(df)
+    prefix = f"{model_name or ''}\x1f"
+    return [hashlib.blake2b((prefix + h).encode("utf-8"), digest_size=16).hexdigest() for h in rows]
+
+
+def iter_chunks(df: pd.DataFrame, size: int = BATCH_SIZE) -> Iterator[Chunk]:
+    """Чанки для загрузки; payload и тексты собираются по колонкам, без построчного iloc."""
+    cols = df[PAYLOAD_COLUMNS].fillna("")
+    ids = point_ids(df)
+    hashes = content_hashes(df)
+    texts = (cols["title"].astype(str) + ". " + cols["description"].astype(str)).tolist()
+    for a in range(0, len(df), size):
+        b = min(a + size, len(df))
+        yield Chunk(ids[a:b], cols.iloc[a:b].to_dict("records"), texts[a:b], hashes[a:b])
+
+
+def lifecycle_payload(stored: Optional[dict], now: str) -> dict:
+    """
+    Поля жизненного цикла для вакансии, найденной сегодня в поиске hh.ru.
+    Раз она в выдаче — она активна, и валидатору новую точку проверять не нужно.
+    Решение archived=True, принятое валидатором раньше, не перетираем.
+    """
+    stored = stored or {}
+    fields = {"first_seen_at": stored.get("first_seen_at") or now, "last_seen_at": now}
+    if stored.get("archived") is True:
+        fields.update(is_active=False, archived=True)
+        if stored.get("archived_checked_at"):
+            fields["archived_checked_at"] = stored["archived_checked_at"]
+    else:
+        fields.update(is_active=True, archived=False, archived_checked_at=now)
+    return fields
+
+
+def enriched_payload(stored: Optional[dict]) -> dict:
+    """
+    Поля обогатителей из залитой точки. Роли и регион из карточки полнее, чем из
+    выдачи поиска, но пустыми значениями колонки парсера не затираем.
+    """
+    fields = {}
+    for key, value in (stored or {}).items():
+        if key not in ENRICHED_FIELDS or value is None:
+            continue
+        if key in PAYLOAD_COLUMNS and not value:
+            continue
+        fields[key] = value
+    return fields
+
+
+def touch_payload(stored: dict, now: str) -> dict:
+    """Для не изменившейся точки: только поля, которые надо обновить (set_payload их дописывает)."""
+    fields = lifecycle_payload(stored, now)
+    return {k: v for k, v in fields.items() if k == "last_seen_at" or stored.get(k) != v}
+
+
+def skip_unchanged(client: QdrantClient, collection: str, chunk: Chunk, now: str) -> Chunk:
+    """
+    Одним retrieve читает content_hash, поля жизненного цикла и обогатителей точек чанка:
+    не изменившиеся уходят в unchanged, остальным дописываются поля жизненного цикла
+    и переносятся поля обогатителей, чтобы upsert их не стёр.
+    """
+    existing = client.retrieve(
+        collection_name=collection,
+        ids=chunk.ids,
+        with_payload=LIFECYCLE_FIELDS + ENRICHED_FIELDS,
+        with_vectors=False,
+    )
+    # сервер возвращает ID в каноническом виде UUID (с дефисами), а у нас md5 без них
+    stored = {uuid.UUID(str(pt.id)): pt.payload or {} for pt in existing}
+    planned = Chunk(ids=[], payloads=[], texts=[], hashes=[], unchanged=dict(chunk.unchanged))
+    for pid, payload, text, h in zip(chunk.ids, chunk.payloads, chunk.texts, chunk.hashes):
+        prev = stored.get(uuid.UUID(pid))
+        if prev is not None and prev.get("content_hash") == h:
+            touch = touch_payload(prev, now)
+            planned.unchanged.setdefault(tuple(sorted(touch.items())), []).append(pid)
+            continue
+        planned.ids.append(pid)
+        planned.payloads.append(
+            {**payload, **enriched_payload(prev), "content_hash": h, **lifecycle_payload(prev, now)}
         )
+        planned.texts.append(text)
+        planned.hashes.append(h)
+    return planned
+
+
+def _produce(chunks: Iterator[Chunk], out: "queue.Queue", stop: threading.Event) -> None:
+    try:
+        for chunk in chunks:
+            while not stop.is_set():
+                try:
+                    out.put(chunk, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+            if stop.is_set():
+                return
+        out.put(None)
+    except BaseException as e:
+        out.put(e)
 
-    def make_point_id(row: pd.Series) -> str:
-        """
-        Детерминированный ID:
-        - основной ключ: url (для hh.ru содержит vacancy/<id>)
-        - fallback: title + company (если url пустой)
-        """
-        url = str(row.get("url", "") or "").strip()
-        if url:
-            return hashlib.md5(url.encode("utf-8")).hexdigest()
-
-        title = str(row.get("title", "") or "").strip().lower()
-        company = str(row.get("company", "") or "").strip().lower()
-        return hashlib.md5(f"{title}::{company}".encode("utf-8")).hexdigest()
-
-    def upsert_chunk(vectors, start_idx):
-        points = []
-        for offset, vec in enumerate(vectors):
-            row = df.iloc[start_idx + offset]
-            payload = {
-                "title": row.get("title", ""),
-                "company": row.get("company", ""),
-                "professional_roles_name": row.get("professional_roles_name", ""),
-                "experience": row.get("experience", ""),
-                "description": row.get("description", ""),
-                "url": row.get("url", ""),
-                "area_name": row.get("area_name", ""),
-            }
-
-            pid = make_point_id(row)
-
-            points.append(
-                models.PointStruct(
-                    id=pid,  
-                    vector=vec.tolist() if hasattr(vec, "tolist") else list(vec),
-                    payload=payload,
-                )
-            )
-        client.upsert(collection_name=QDRANT_COLLECTION, points=points)
 
+def upload(
+    df: pd.DataFrame,
+    model,
+    client: QdrantClient,
+    embed_cache=None,
+    collection: Optional[str] = None,
+    writers: int = UPLOAD_WRITERS,
+) -> int:
+    """
+    Конвейер загрузки: поток сборки чанков (и сверки content_hash с Qdrant) ->
+    кодирование в текущем потоке -> пул писателей, которые отправляют точки
+    пачками по UPSERT_BATCH. Не изменившимся точкам обновляются только поля
+    жизненного цикла (last_seen_at и т.п.).
+    Очереди ограничены, так что кодирование не убегает вперёд записи.
+    Возвращает число обработанных строк.
+    """
+    collection = collection or QDRANT_COLLECTION
     n = len(df)
-    steps = math.ceil(n / BATCH_SIZE)
-    for s in tqdm(range(steps), desc="Upserting"):
-        a = s * BATCH_SIZE
-        b = min((s + 1) * BATCH_SIZE, n)
-
-        batch_docs = (df.iloc[a:b]["title"].fillna("") + ". " + df.iloc[a:b]["description"].fillna("")).tolist()
-
-        vecs = model.encode(
-        batch_docs,
-        batch_size=BATCH_SIZE,
-        show_progress_bar=False,
-        normalize_embeddings=True,
-        )
-        upsert_chunk(vecs, a)
+    if not n:
+        return 0
+    now = datetime.now(timezone.utc).isoformat()
+
+    chunks: "queue.Queue" = queue.Queue(maxsize=2)
+    stop = threading.Event()
+    planned = (skip_unchanged(client, collection, c, now) for c in iter_chunks(df))
+    producer = threading.Thread(target=_produce, args=(planned, chunks, stop), daemon=True)
+    producer.start()
+
+    # не больше 2 * writers пачек ждут записи
+    slots = threading.BoundedSemaphore(max(1, writers) * 2)
+    futures = []
+    last: Optional[Tuple[str, list, Optional[dict]]] = None
+    written = touched = 0
+    started = time.perf_counter()
+
+    def send(op: Tuple[str, list, Optional[dict]], wait: bool) -> None:
+        kind, items, payload = op
+        if kind == "upsert":
+            client.upload_points(collection_name=collection, points=items, batch_size=len(items), wait=wait)
+        else:
+            client.set_payload(collection_name=collection, payload=payload, points=items, wait=wait)
+
+    def write(op: Tuple[str, list, Optional[dict]]) -> None:
+        try:
+            send(op, wait=False)
+        finally:
+            slots.release()
+
+    def submit(pool: ThreadPoolExecutor, op: Tuple[str, list, Optional[dict]]) -> None:
+        nonlocal last
+        slots.acquire()
+        futures.append(pool.submit(write, op))
+        last = op
+
+    pbar = tqdm(total=n, desc="Upserting")
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, writers), thread_name_prefix="qdrant-writer") as pool:
+            while True:
+                chunk = chunks.get()
+                if chunk is None:
+                    break
+                if isinstance(chunk, BaseException):
+                    raise chunk
+                for touch, ids in chunk.unchanged.items():
+                    for a in range(0, len(ids), UPSERT_BATCH):
+                        submit(pool, ("touch", ids[a:a + UPSERT_BATCH], dict(touch)))
+                if chunk.ids:
+                    vecs = encode_cached(model, chunk.texts, embed_cache)
+                    for a in range(0, len(chunk.ids), UPSERT_BATCH):
+                        b = a + UPSERT_BATCH
+                        points = [
+                            models.PointStruct(id=pid, vector=vec.tolist(), payload=payload)
+                            for pid, vec, payload in zip(chunk.ids[a:b], vecs[a:b], chunk.payloads[a:b])
+                        ]
+                        submit(pool, ("upsert", points, None))
+                written += len(chunk.ids)
+                touched += chunk.unchanged_count
+                pbar.update(len(chunk.ids) + chunk.unchanged_count)
+                # ошибка записи останавливает загрузку сразу, а не в конце
+                for f in [f for f in futures if f.done()]:
+                    f.result()
+                    futures.remove(f)
+            for f in futures:
+                f.result()
+    finally:
+        stop.set()
+        pbar.close()
+
+    # писатели шлют без ожидания применения; операции коллекции применяются по порядку,
+    # поэтому повтор последней операции с wait=True дожидается применения всех предыдущих
+    if last is not None:
+        send(last, wait=True)
+    elapsed = time.perf_counter() - started
+    print(
+        f"⏱ {n} точек за {elapsed:.1f} с ({n / elapsed:.1f} points/s, писателей: {writers}): "
+        f"записано {written}, без изменений {touched}"
+    )
+    return n
+
+
+def main():
+
+    # Parquet от парсера, если он есть, иначе CSV по тому же пути
+    df = read_vacancies(SAVE_VACANCIES_AIRFLOW_PATH)
+
+    # уже залитые публикации отсекает парсер; повторно пришедшие вакансии сверяет skip_unchanged
+    state = IngestState() if INCREMENTAL else None
+
+    # EMBED_WORKERS > 1 — пул процессов вместо модели в текущем процессе
+    model = load_encoder(EMBED_MODEL)
+    dim = model.get_sentence_embedding_dimension()
+    embed_cache = get_embedding_cache(ENCODER_NAME, dim)
+
+    client = QdrantClient(url=QDRANT_URL)
+
+    ensure_collection(client, QDRANT_COLLECTION, dim)
+
+    try:
+        n = upload(df, model, client, embed_cache)
+    finally:
+        if hasattr(model, "close"):
+            model.close()
 
-    del vecs, batch_docs
-    gc.collect()
+    if state is not None:
+        state.commit_seen()
+        state.commit_watermarks()
 
     print(f"✅ Залили {n} документов в коллекцию '{QDRANT_COLLECTION}' ({QDRANT_URL})")
-    print(f"📄 Источник CSV: {SAVE_VACANCIES_AIRFLOW_PATH}")
+    print(f"📄 Источник: {SAVE_VACANCIES_AIRFLOW_PATH}")
 
 if __name__ == "__main__":
     main()
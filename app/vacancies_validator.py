@@ -1,132 +1,49 @@
+import asyncio
 import os
-import re
-import time
 from datetime import datetime, timezone
-from typing import Optional, List, Any, Tuple
 
-import httpx
 from qdrant_client import QdrantClient
 
+from enrichment import enrich, enrichers
+from revalidation import BUDGET, count_due, default_tiers
+from scroll_checkpoint import get_checkpoint
+
 QDRANT_URL = os.getenv("QDRANT_URL")
 COLLECTION = os.getenv("QDRANT_COLLECTION")
 
-HH_API = "https://api.hh.ru/vacancies/{}"
-HH_ID_RE = re.compile(r"/vacancy/(\d+)", re.IGNORECASE)
-
-
-SLEEP_SEC = float(os.getenv("HH_VALIDATE_SLEEP_SEC", "0.35"))
-SCROLL_LIMIT = int(os.getenv("QDRANT_SCROLL_LIMIT", "256"))
-UPDATE_BATCH = int(os.getenv("QDRANT_UPDATE_BATCH", "128"))
-
-
-
-def extract_hh_id(url: str) -> Optional[str]:
-    if not url:
-        return None
-    m = HH_ID_RE.search(url)
-    return m.group(1) if m else None
-
-
-def check_archived(hc: httpx.Client, hh_id: str) -> Tuple[bool, str]:
-    """
-    returns (inactive, reason)
-    inactive if archived=true OR 404
-    """
-    r = hc.get(HH_API.format(hh_id))
-    if r.status_code == 404:
-        return True, "404"
-    r.raise_for_status()
-    data = r.json()
-    if bool(data.get("archived", False)):
-        return True, "archived_true"
-    return False, "active"
-
-
-def flush_payload(q: QdrantClient, ids: List[Any], payload: dict):
-    for i in range(0, len(ids), UPDATE_BATCH):
-        q.set_payload(
-            collection_name=COLLECTION,
-            payload=payload,
-            points=ids[i:i + UPDATE_BATCH],
-        )
+# карточка запрашивается один раз, заодно обновляем роли и регион (бывший бэкфилл)
+ENRICHERS = os.getenv("VALIDATOR_ENRICHERS", "archive,roles,area,version")
+# статус архива должен быть текущим: по умолчанию карточка из кеша hh_client всегда
+# перепроверяется условным запросом, а не отдаётся до истечения HH_CACHE_TTL_SEC
+CACHE_MAX_AGE_SEC = float(os.getenv("VALIDATOR_CACHE_MAX_AGE_SEC", "0"))
 
 
 def main():
     q = QdrantClient(url=QDRANT_URL, prefer_grpc=False)
 
-    offset = None
-    total_points = 0
-    total_checked = 0
-    total_activated = 0
-    total_deactivated = 0
-    total_skipped = 0
-
-    now = datetime.now(timezone.utc).isoformat()
-
-    with httpx.Client(timeout=20, headers={"User-Agent": "JobRadar-AI validator"}) as hc:
-        while True:
-            points, offset = q.scroll(
-                collection_name=COLLECTION,
-                limit=SCROLL_LIMIT,
-                offset=offset,
-                with_payload=True,
-                with_vectors=False,
-            )
-
-            if not points:
-                break
-
-            total_points += len(points)
-
-            activate_ids: List[Any] = []
-            deactivate_ids: List[Any] = []
-
-            for pt in points:
-                p = pt.payload or {}
-                url = (p.get("url") or p.get("alternate_url") or "").strip()
-                hh_id = extract_hh_id(url)
-
-                if not hh_id:
-                    total_skipped += 1
-                    continue
-
-                try:
-                    inactive, _reason = check_archived(hc, hh_id)
-                except Exception:
-                    total_skipped += 1
-                    continue
-
-                total_checked += 1
-                if inactive:
-                    deactivate_ids.append(pt.id)
-                else:
-                    activate_ids.append(pt.id)
-
-                time.sleep(SLEEP_SEC)
-
-            if activate_ids:
-                flush_payload(
-                    q,
-                    activate_ids,
-                    {"is_active": True, "archived": False, "archived_checked_at": now},
-                )
-                total_activated += len(activate_ids)
-
-            if deactivate_ids:
-                flush_payload(
-                    q,
-                    deactivate_ids,
-                    {"is_active": False, "archived": True, "archived_checked_at": now},
-                )
-                total_deactivated += len(deactivate_ids)
-
-            if offset is None:
-                break
-
-    print(
-        f"points_seen={total_points} checked_hh={total_checked} "
-        f"activated={total_activated} deactivated={total_deactivated} skipped={total_skipped}"
+    tiers = default_tiers()
+    checkpoint = get_checkpoint(f"validator-{COLLECTION}")
+    resume = checkpoint.load([tier.name for tier in tiers]) if checkpoint else None
+    if resume:
+        # фильтры уровней строим от времени прерванного прогона, чтобы offset остался валидным
+        started = datetime.fromisoformat(resume["now"])
+        print(f"Продолжаю прогон от {resume['now']}: {resume['stats']['points_seen']} точек уже пройдено")
+    else:
+        started = datetime.now(timezone.utc)
+    due = count_due(q, COLLECTION, tiers, started)
+    print(f"due: {sum(due)} budget={BUDGET or 'unlimited'}")
+
+    plan = [(tier.name, tier.due_filter(started)) for tier in tiers]
+    stats = asyncio.run(
+        enrich(
+            q, COLLECTION, enrichers(ENRICHERS), plan, started.isoformat(), budget=BUDGET,
+            user_agent="JobRadar-AI validator", checkpoint=checkpoint, resume=resume,
+            max_age=CACHE_MAX_AGE_SEC,
+        )
     )
+    for tier, n in zip(tiers, due):
+        print(f"  {tier.name:>8}: due={n} checked={stats.by_tier.get(tier.name, 0)} every {tier.recheck_hours:g}h")
+    print(stats)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,74 @@
+"""
+Сравнение кодирования вакансий: фиксированные батчи по BATCH_SIZE документов
+(как было в upload_to_qdrant) против encode_dynamic() с бюджетом токенов.
+
+Печатает docs/s обоих вариантов и максимальное расхождение векторов
+(1 - cosine), чтобы убедиться, что обрезка и сортировка не меняют результат.
+
+Запуск: python bench/bench_embed.py --csv vacancies.csv --model <EMBED_MODEL> --limit 2000
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from embedder import EMBED_MAX_BATCH, EMBED_TOKEN_BUDGET, encode_dynamic
+from handoff import read_vacancies
+
+
+def load_texts(path: str, limit: int):
+    df = read_vacancies(path).head(limit)
+    return (df["title"].fillna("") + ". " + df["description"].fillna("")).tolist()
+
+
+def encode_fixed(model, texts, batch_size: int) -> np.ndarray:
+    chunks = []
+    for i in range(0, len(texts), batch_size):
+        chunks.append(
+            model.encode(
+                texts[i:i + batch_size],
+                batch_size=batch_size,
+                show_progress_bar=False,
+                normalize_embeddings=True,
+            )
+        )
+    return np.vstack(chunks)
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=os.getenv("SAVE_VACANCIES_AIRFLOW_PATH"), help="файл парсера (CSV или Parquet)")
+    parser.add_argument("--model", default=os.getenv("MODEL_DIR") or os.getenv("EMBED_MODEL"))
+    parser.add_argument("--limit", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=2, help="фиксированный батч для сравнения")
+    parser.add_argument("--token-budget", type=int, default=EMBED_TOKEN_BUDGET)
+    parser.add_argument("--max-batch", type=int, default=EMBED_MAX_BATCH)
+    args = parser.parse_args()
+
+    texts = load_texts(args.csv, args.limit)
+    model = SentenceTransformer(args.model)
+    print(f"docs={len(texts)} model={args.model} max_seq_length={model.max_seq_length}")
+
+    fixed, t_fixed = timed(lambda: encode_fixed(model, texts, args.batch_size))
+    dynamic, t_dynamic = timed(lambda: encode_dynamic(model, texts, args.token_budget, args.max_batch))
+
+    drift = 1.0 - np.einsum("ij,ij->i", fixed, dynamic)
+    print(f"   fixed(bs={args.batch_size}): {len(texts) / t_fixed:8.1f} docs/s ({t_fixed:.1f}s)")
+    print(f"dynamic(budget={args.token_budget}): {len(texts) / t_dynamic:8.1f} docs/s ({t_dynamic:.1f}s)")
+    print(f"speedup: {t_fixed / t_dynamic:.2f}x, max(1 - cos) = {drift.max():.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Подбор EMBED_WORKERS × EMBED_TORCH_THREADS для кодирования на текущей машине.
+
+Для каждого сочетания поднимает EmbeddingPool (или модель в текущем процессе
+при workers=1), прогревает его и кодирует одни и те же тексты вакансий.
+Печатает docs/s по всем сочетаниям и лучшее из них.
+
+Запуск: python bench/bench_embed_pool.py --csv vacancies.csv --model <EMBED_MODEL> --limit 4000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+from embed_pool import EmbeddingPool
+from embedder import encode_texts
+from handoff import read_vacancies
+
+
+def load_texts(path: str, limit: int):
+    df = read_vacancies(path).head(limit)
+    return (df["title"].fillna("") + ". " + df["description"].fillna("")).tolist()
+
+
+def combos(cpus: int):
+    """Сочетания (workers, threads), у которых workers * threads не больше числа ядер."""
+    for workers in sorted({1, 2, 4, 8, 16, cpus} - {0}):
+        if workers > cpus:
+            continue
+        for threads in sorted({1, 2, 4, cpus // workers} - {0}):
+            if workers * threads <= cpus:
+                yield workers, threads
+
+
+def run_single(args) -> None:
+    """workers=1: модель в отдельном процессе, чтобы число потоков torch задавалось до его старта."""
+    from embed_pool import load_encoder
+
+    texts = load_texts(args.csv, args.limit)
+    model = load_encoder(args.model, workers=1, threads=args.threads)
+    encode_texts(model, texts[: args.warmup])
+    started = time.perf_counter()
+    encode_texts(model, texts)
+    print(time.perf_counter() - started)
+
+
+def measure(args, texts, workers: int, threads: int) -> float:
+    if workers == 1:
+        cmd = [sys.executable, __file__, "--single", "--csv", args.csv, "--model", args.model,
+               "--limit", str(args.limit), "--warmup", str(args.warmup), "--threads", str(threads)]
+        return float(subprocess.check_output(cmd, text=True).strip().splitlines()[-1])
+    with EmbeddingPool(args.model, workers=workers, threads=threads) as pool:
+        encode_texts(pool, texts[: args.warmup * workers])
+        started = time.perf_counter()
+        encode_texts(pool, texts)
+        return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=os.getenv("SAVE_VACANCIES_AIRFLOW_PATH"), help="файл парсера (CSV или Parquet)")
+    parser.add_argument("--model", default=os.getenv("MODEL_DIR") or os.getenv("EMBED_MODEL"))
+    parser.add_argument("--limit", type=int, default=4000)
+    parser.add_argument("--warmup", type=int, default=64)
+    parser.add_argument("--cpus", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--threads", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if not args.csv or not args.model:
+        parser.error("нужны --csv и --model (или SAVE_VACANCIES_AIRFLOW_PATH и EMBED_MODEL)")
+
+    if args.single:
+        run_single(args)
+        return
+
+    texts = load_texts(args.csv, args.limit)
+    print(f"docs={len(texts)} model={args.model} cpus={args.cpus}")
+    results = []
+    for workers, threads in combos(args.cpus):
+        elapsed = measure(args, texts, workers, threads)
+        results.append((len(texts) / elapsed, workers, threads))
+        print(f"workers={workers:2d} threads={threads:2d}: {len(texts) / elapsed:8.1f} docs/s ({elapsed:.1f}s)")
+
+    rate, workers, threads = max(results)
+    print(f"best: EMBED_WORKERS={workers} EMBED_TORCH_THREADS={threads} ({rate:.1f} docs/s)")
+
+
+if __name__ == "__main__":
+    main()
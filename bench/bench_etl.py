@@ -0,0 +1,132 @@
+"""
+Бенчмарк сетевой части ETL против локального hh_replay_server.
+
+Прогоняет parse_hh_vacancies(), backfill_prof_name.main() и
+vacancies_validator.main() и печатает для каждого этапа время, число запросов
+к «hh.ru», запросы/с и пиковую память (tracemalloc и ru_maxrss).
+Qdrant для валидатора и бэкфилла — локальный in-memory QdrantClient,
+заполненный результатом парсинга.
+
+Запуск: python bench/bench_etl.py --vacancies 2000 --latency-ms 30
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+from hh_replay_server import TITLES, ReplayConfig, ReplayData, ReplayServer
+
+
+def measure(name: str, server: ReplayServer, fn):
+    before = server.stats.requests
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    requests = server.stats.requests - before
+    maxrss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(
+        f"{name:>10}: wall={elapsed:7.2f}s requests={requests:6d} "
+        f"rps={requests / elapsed if elapsed else 0:7.1f} peak_py={peak / 2**20:7.1f}MB maxrss={maxrss_mb:7.1f}MB"
+    )
+    return result
+
+
+def seed_qdrant(client, collection: str, df) -> None:
+    from qdrant_client.http import models
+
+    client.create_collection(collection, vectors_config=models.VectorParams(size=4, distance=models.Distance.COSINE))
+    points = [
+        models.PointStruct(
+            id=str(uuid.uuid4()),
+            vector=[0.5, 0.5, 0.5, 0.5],
+            payload={"title": row.title, "url": row.url, "description": row.description, "is_active": True},
+        )
+        for row in df.itertuples()
+    ]
+    for i in range(0, len(points), 256):
+        client.upsert(collection, points=points[i:i + 256])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vacancies", type=int, default=2000)
+    parser.add_argument("--fixtures")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--archived-rate", type=float, default=0.1)
+    parser.add_argument("--missing-rate", type=float, default=0.05)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--cache", action="store_true", help="не отключать дисковый кеш карточек между этапами")
+    args = parser.parse_args()
+
+    if args.fixtures:
+        data = ReplayData.from_fixtures(args.fixtures, args.archived_rate, args.missing_rate)
+    else:
+        data = ReplayData.synthetic(args.vacancies, args.archived_rate, args.missing_rate)
+    config = ReplayConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after_sec=0.2,
+    )
+    workdir = tempfile.mkdtemp(prefix="jobradar-bench-")
+
+    with ReplayServer(data, config) as server:
+        # модули приложения читают настройки из окружения при импорте
+        os.environ.update(
+            {
+                "HH_API_BASE": server.base_url,
+                "PROXY_LIST_URL": f"{server.base_url}/proxy-list",
+                "HH_CACHE_PATH": os.path.join(workdir, "hh_cache.sqlite"),
+                "HH_CACHE_ENABLED": "1" if args.cache else "0",
+                "INGEST_STATE_DIR": os.path.join(workdir, "state"),
+                "SCROLL_CHECKPOINT_DIR": os.path.join(workdir, "checkpoints"),
+                "QDRANT_COLLECTION": "bench",
+            }
+        )
+        os.environ.setdefault("HH_RATE_RPS", "50")
+        os.environ.setdefault("HH_RATE_MAX_RPS", "200")
+        os.environ.setdefault("HH_BACKOFF_BASE", "0.1")
+
+        from qdrant_client import QdrantClient
+
+        import backfill_prof_name
+        import hh_parser
+        import vacancies_validator
+
+        print(f"replay: {server.base_url} vacancies={len(data.vacancies)} latency={args.latency_ms}ms")
+        df = measure(
+            "parse",
+            server,
+            lambda: hh_parser.parse_hh_vacancies(TITLES, per_page=100, area=["1", "2", "3"], pages_to_parse=args.pages),
+        )
+        print(f"{'':>10}  rows={len(df)}")
+
+        qdrant = QdrantClient(":memory:")
+        seed_qdrant(qdrant, "bench", df)
+        vacancies_validator.QdrantClient = lambda **kwargs: qdrant
+        backfill_prof_name.QdrantClient = lambda **kwargs: qdrant
+        vacancies_validator.COLLECTION = backfill_prof_name.QDRANT_COLLECTION = "bench"
+
+        # бэкфилл первым: валидатор ставит enrich_version, и после него кандидатов не остаётся
+        measure("backfill", server, backfill_prof_name.main)
+        measure("validator", server, vacancies_validator.main)
+        print(f"replay requests by kind: {server.stats.by_path}")
+
+
+if __name__ == "__main__":
+    main()
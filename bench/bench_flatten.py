@@ -0,0 +1,106 @@
+"""
+Микробенчмарк df_main(): схемный однопроходный flatten против прежней
+реализации на json_normalize. Запуск: python bench/bench_flatten.py [10000 100000]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+import pandas as pd
+
+from hh_parser import FLAT_SCHEMA, df_main
+
+
+def legacy_df_main(frames: list[dict]) -> pd.DataFrame:
+    """Реализация df_main до перехода на FLAT_SCHEMA."""
+    cols = list(FLAT_SCHEMA)
+    result = pd.DataFrame(frames)
+    result1 = result.copy()
+    for col in result.columns:
+        df_normalized = pd.json_normalize(result[col])
+        if len(df_normalized.columns) > 1:
+            df_normalized.columns = [f"{col}_{c}" for c in df_normalized.columns]
+            result1 = pd.concat([result1.drop(columns=[col]), df_normalized], axis=1)
+    result1["professional_roles_id"] = result1["professional_roles"].apply(
+        lambda x: x[0]["id"] if x else None
+    )
+    result1["professional_roles_name"] = result1["professional_roles"].apply(
+        lambda x: x[0]["name"] if x else None
+    )
+    while True:
+        columns_to_drop = []
+        for col in result1.columns:
+            if not result1[col].empty and result1[col].apply(lambda x: isinstance(x, (dict, list))).any():
+                columns_to_drop.append(col)
+        if columns_to_drop:
+            result1.drop(columns=columns_to_drop, inplace=True)
+        else:
+            break
+    return result1[cols]
+
+
+ROLES = [("96", "Программист, разработчик"), ("165", "Дата-сайентист"), ("10", "Аналитик")]
+AREAS = [("1", "Москва"), ("2", "Санкт-Петербург"), ("3", "Екатеринбург")]
+
+
+def synthetic_item(i: int, rnd: random.Random) -> dict:
+    """Вакансия в форме ответа /vacancies с типичным набором вложенных полей."""
+    role_id, role_name = rnd.choice(ROLES)
+    area_id, area_name = rnd.choice(AREAS)
+    return {
+        "id": str(100000000 + i),
+        "premium": False,
+        "name": f"Вакансия {i}",
+        "department": None,
+        "has_test": rnd.random() < 0.1,
+        "area": {"id": area_id, "name": area_name, "url": f"https://api.hh.ru/areas/{area_id}"},
+        "salary": {"from": rnd.randint(100, 300) * 1000, "to": None, "currency": "RUR", "gross": False},
+        "type": {"id": "open", "name": "Открытая"},
+        "address": None,
+        "published_at": f"2025-01-{rnd.randint(1, 28):02d}T10:00:00+0300",
+        "url": f"https://api.hh.ru/vacancies/{100000000 + i}?host=hh.ru",
+        "alternate_url": f"https://hh.ru/vacancy/{100000000 + i}",
+        "employer": {
+            "id": str(rnd.randint(1, 5000)),
+            "name": f"Компания {rnd.randint(1, 5000)}",
+            "logo_urls": {"90": "https://img.hhcdn.ru/x.png", "original": "https://img.hhcdn.ru/y.png"},
+            "trusted": True,
+        },
+        "snippet": {"requirement": "Python, SQL", "responsibility": "Модели, отчёты"},
+        "schedule": {"id": "remote", "name": "Удаленная работа"},
+        "working_days": [],
+        "professional_roles": [{"id": role_id, "name": role_name}],
+        "experience": {"id": "between1And3", "name": "От 1 года до 3 лет"},
+        "employment": {"id": "full", "name": "Полная занятость"},
+        "key_skills": "Python, SQL",
+        "search_query": "Data Scientist",
+    }
+
+
+def bench(fn, frames, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(frames)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(sizes: list[int]) -> None:
+    rnd = random.Random(42)
+    for n in sizes:
+        frames = [synthetic_item(i, rnd) for i in range(n)]
+        new_df = df_main(frames)
+        old_df = legacy_df_main(frames)
+        pd.testing.assert_frame_equal(new_df.fillna("").astype(str), old_df.fillna("").astype(str))
+        repeat = 3 if n <= 10000 else 1
+        t_new = bench(df_main, frames, repeat)
+        t_old = bench(legacy_df_main, frames, repeat)
+        print(f"n={n:>7}  legacy={t_old:8.3f}s  schema={t_new:8.3f}s  speedup={t_old / t_new:6.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or [10000, 100000])
@@ -0,0 +1,92 @@
+"""
+Промежуточный файл парсера: Parquet против CSV.
+
+Пишет одни и те же вакансии (из файла парсера или синтетические, с длинными
+многострочными описаниями, кавычками и запятыми) обоими форматами через
+handoff.VacancyWriter, проверяет, что read_vacancies() возвращает их без
+искажений, и печатает размер файла, время записи и чтения.
+
+Запуск: python bench/bench_handoff.py --rows 20000
+        python bench/bench_handoff.py --source vacancies.csv
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+import pandas as pd
+
+from handoff import VACANCY_COLUMNS, VacancyWriter, read_vacancies, use_parquet
+
+WORDS = "python данные модель продукт команда опыт задачи, \"кавычки\" sql; аналитика".split()
+
+
+def synthetic(rows: int, seed: int = 1) -> pd.DataFrame:
+    rnd = random.Random(seed)
+
+    def text(n: int) -> str:
+        lines = [" ".join(rnd.choice(WORDS) for _ in range(rnd.randint(5, 20))) for _ in range(n)]
+        return "\n".join(lines)
+
+    return pd.DataFrame(
+        {
+            "title": [f"Data Scientist {i}" for i in range(rows)],
+            "professional_roles_name": [rnd.choice(["Дата-сайентист", "Аналитик", ""]) for _ in range(rows)],
+            "company": [f"ООО «Компания {i % 500}»" for i in range(rows)],
+            "experience": [rnd.choice(["Нет опыта", "От 1 года до 3 лет", "От 3 до 6 лет"]) for _ in range(rows)],
+            "description": [text(rnd.randint(5, 60)) for _ in range(rows)],
+            "url": [f"https://hh.ru/vacancy/{100000 + i}" for i in range(rows)],
+            "area_name": [rnd.choice(["Москва", "Санкт-Петербург", "Екатеринбург"]) for _ in range(rows)],
+        }
+    )
+
+
+def write(df: pd.DataFrame, path: str, parquet: bool, chunk_size: int) -> float:
+    started = time.perf_counter()
+    writer = VacancyWriter(path, chunk_size, parquet=parquet)
+    rows = df.to_dict("records")
+    for i in range(0, len(rows), chunk_size):
+        writer.write(rows[i:i + chunk_size])
+    writer.close()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", help="файл парсера (CSV или Parquet) вместо синтетики")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--chunk-size", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    df = read_vacancies(args.source) if args.source else synthetic(args.rows)
+    df = df[VACANCY_COLUMNS].fillna("")
+    print(f"rows={len(df)} parquet available={use_parquet()}")
+
+    workdir = tempfile.mkdtemp(prefix="jobradar-handoff-")
+    for fmt in ("csv", "parquet"):
+        # у каждого формата своя папка: read_vacancies() выбирает файл по соседству
+        base = os.path.join(workdir, fmt, "vacancies.csv")
+        os.makedirs(os.path.dirname(base))
+        t_write = write(df, base, fmt == "parquet", args.chunk_size)
+        path = base if fmt == "csv" else str(Path(base).with_suffix(".parquet"))
+        reads = []
+        for _ in range(args.repeats):
+            started = time.perf_counter()
+            back = read_vacancies(base)
+            reads.append(time.perf_counter() - started)
+        back = back[VACANCY_COLUMNS].fillna("").astype(str)
+        mismatched = int((back != df.astype(str)).any(axis=1).sum())
+        print(
+            f"{fmt:>8}: size={os.path.getsize(path) / 2**20:7.1f}MB write={t_write:6.2f}s "
+            f"read={min(reads):6.2f}s mismatched_rows={mismatched}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Эквивалентность и скорость бэкендов html_text на корпусе описаний в стиле hh.ru.
+Запуск: python bench/bench_html_text.py [число_документов]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+from html_text import BACKENDS, bs4_text
+
+PHRASES = [
+    "Разработка и поддержка ML-моделей",
+    "Опыт работы с Python от 3 лет",
+    "Знание SQL &amp; PostgreSQL",
+    "Работа с &laquo;большими данными&raquo;",
+    "ДМС с&nbsp;первого месяца",
+    "Гибкий график &mdash; 5/2",
+    "A/B-тесты, метрики &lt;retention&gt;",
+    "Зарплата от 250&#160;000 ₽",
+    "Удалённо или офис в Москве",
+    "Английский — не ниже B1",
+]
+HEADERS = ["Обязанности:", "Требования:", "Условия:", "Мы предлагаем:", "О компании"]
+
+
+def make_description(rnd: random.Random) -> str:
+    parts = []
+    if rnd.random() < 0.3:
+        parts.append(f"<p><strong>{rnd.choice(PHRASES)}</strong></p>")
+    for header in rnd.sample(HEADERS, k=rnd.randint(2, 4)):
+        parts.append(f"<p><strong>{header}</strong></p>")
+        items = "".join(
+            f"<li>{rnd.choice(PHRASES)}{'<br />' if rnd.random() < 0.1 else ''}</li>" for _ in range(rnd.randint(2, 7))
+        )
+        parts.append(f"<ul>{items}</ul>")
+        if rnd.random() < 0.4:
+            parts.append(f"<p>{rnd.choice(PHRASES)} <em>{rnd.choice(PHRASES)}</em>\n  {rnd.choice(PHRASES)}</p>")
+    if rnd.random() < 0.05:
+        parts.append("<!-- tracking > pixel --><p>Контакты: <a href=\"https://hh.ru/?a=1&b=2\" title='a>b'>hh.ru</a></p>")
+    return "".join(parts)
+
+
+EDGE_CASES = [
+    "",
+    "plain text without tags",
+    "<p>a<script>var x = '<p>';</script>b</p>",
+    "<style>.a{color:red}</style><p>text</p>",
+    "<p>x<!-- c > d -->y</p>",
+    "a < b and c>d",
+    "<p>line1\n  line2</p>&nbsp;z",
+    "<br/>q<![CDATA[zz]]>w",
+    "<p>a &lt;b&gt; &amp;amp; &laquo;x&raquo;</p>",
+    "x<?xml version='1.0'?>y",
+    "<!DOCTYPE html><p>z</p>",
+    "a<b",
+    "<P CLASS=\"x\">Upper</P><BR>case",
+    "<template>t</template>x",
+    "<p>a</p><script>x",
+    "a</ br>b",
+    "<p>a</p><!--<b>x</b>",
+    "<p>x <!--a-- > y --> z</p>",
+    "a&nbspb",
+    "a &foo; b",
+]
+
+
+def main(n: int) -> None:
+    rnd = random.Random(7)
+    corpus = [make_description(rnd) for _ in range(n)] + EDGE_CASES
+    reference = [bs4_text(html) if html else "" for html in corpus]
+
+    for name, fn in BACKENDS.items():
+        mismatches = [
+            (html, expected, got)
+            for html, expected in zip(corpus, reference)
+            for got in [fn(html) if html else ""]
+            if got != expected
+        ]
+        for html, expected, got in mismatches[:5]:
+            print(f"[{name}] MISMATCH\n  html={html[:200]!r}\n  bs4 ={expected[:200]!r}\n  got ={got[:200]!r}")
+        started = time.perf_counter()
+        for html in corpus:
+            if html:
+                fn(html)
+        elapsed = time.perf_counter() - started
+        print(
+            f"{name:>6}: {len(corpus) / elapsed:10.0f} docs/s  {elapsed:7.3f}s  "
+            f"mismatches={len(mismatches)}/{len(corpus)}"
+        )
+        if mismatches:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
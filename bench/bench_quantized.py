@@ -0,0 +1,109 @@
+"""
+Проверка качества и скорости int8-квантизации модели эмбеддингов против fp32.
+
+На отложенной выборке вакансий (CSV парсера) и поисковых запросов считает:
+- косинус между fp32- и int8-векторами одних и тех же текстов (среднее, 1-й перцентиль, минимум);
+- пересечение top-k выдачи по каждому запросу (поиск по той же выборке вакансий);
+- скорость кодирования документов (docs/s) и задержку одного запроса (p50/p95).
+
+Запуск: python bench/bench_quantized.py --csv vacancies.csv --model <EMBED_MODEL> --queries queries.txt
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+import numpy as np
+
+from embed_pool import load_model
+from embedder import encode_texts
+from handoff import read_vacancies
+
+DEFAULT_QUERIES = [
+    "python разработчик",
+    "аналитик данных",
+    "data scientist удалённо",
+    "ml engineer",
+    "backend developer go",
+    "frontend react",
+    "devops kubernetes",
+    "продуктовый аналитик",
+    "тестировщик автоматизация",
+    "инженер по машинному обучению",
+]
+
+
+def load_texts(path: str, limit: int, seed: int):
+    df = read_vacancies(path)
+    # отложенная выборка: случайные строки, а не первые по порядку парсинга
+    df = df.sample(n=min(limit, len(df)), random_state=seed)
+    return (df["title"].fillna("") + ". " + df["description"].fillna("")).tolist()
+
+
+def query_latency(model, queries, repeats: int):
+    timings = []
+    for _ in range(repeats):
+        for q in queries:
+            started = time.perf_counter()
+            encode_texts(model, [q])
+            timings.append(time.perf_counter() - started)
+    return np.percentile(timings, 50) * 1000, np.percentile(timings, 95) * 1000
+
+
+def top_k(doc_vecs: np.ndarray, query_vecs: np.ndarray, k: int) -> np.ndarray:
+    scores = query_vecs @ doc_vecs.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=os.getenv("SAVE_VACANCIES_AIRFLOW_PATH"), help="файл парсера (CSV или Parquet)")
+    parser.add_argument("--model", default=os.getenv("MODEL_DIR") or os.getenv("EMBED_MODEL"))
+    parser.add_argument("--queries", help="файл с запросами, по одному на строку")
+    parser.add_argument("--limit", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if not args.csv or not args.model:
+        parser.error("нужны --csv и --model (или SAVE_VACANCIES_AIRFLOW_PATH и EMBED_MODEL)")
+
+    texts = load_texts(args.csv, args.limit, args.seed)
+    if args.queries:
+        queries = [q.strip() for q in Path(args.queries).read_text(encoding="utf-8").splitlines() if q.strip()]
+    else:
+        queries = DEFAULT_QUERIES
+    print(f"docs={len(texts)} queries={len(queries)} model={args.model} k={args.k}")
+
+    results = {}
+    for precision in ("fp32", "int8"):
+        model = load_model(args.model, precision)
+        encode_texts(model, texts[:32])
+        started = time.perf_counter()
+        docs = encode_texts(model, texts)
+        elapsed = time.perf_counter() - started
+        p50, p95 = query_latency(model, queries, args.repeats)
+        results[precision] = (docs, encode_texts(model, queries))
+        print(f"{precision}: {len(texts) / elapsed:8.1f} docs/s, query p50={p50:.1f}ms p95={p95:.1f}ms")
+        del model
+
+    fp_docs, fp_queries = results["fp32"]
+    q_docs, q_queries = results["int8"]
+    cos = np.einsum("ij,ij->i", fp_docs, q_docs)
+    print(f"cosine(fp32, int8) по документам: mean={cos.mean():.4f} p1={np.percentile(cos, 1):.4f} min={cos.min():.4f}")
+    qcos = np.einsum("ij,ij->i", fp_queries, q_queries)
+    print(f"cosine(fp32, int8) по запросам:   mean={qcos.mean():.4f} min={qcos.min():.4f}")
+
+    k = min(args.k, len(texts))
+    ref = top_k(fp_docs, fp_queries, k)
+    # int8-запросы ищем по int8-документам: так выдачу увидит бот после переиндексации
+    got = top_k(q_docs, q_queries, k)
+    overlap = np.array([len(set(a) & set(b)) / k for a, b in zip(ref, got)])
+    print(f"top-{k} overlap: mean={overlap.mean():.3f} min={overlap.min():.3f}")
+
+
+if __name__ == "__main__":
+    main()
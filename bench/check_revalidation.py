@@ -0,0 +1,62 @@
+"""
+Проверка ревалидации карточек через путь парсера.
+
+Карточка отдаётся с ETag; после истечения HH_CACHE_TTL_SEC кеш hh_client
+переспрашивает её с If-None-Match, сервер отвечает 304, и _fetch_detail()
+парсера должен вернуть закешированное тело, а не ошибку.
+
+Запуск: python bench/check_revalidation.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ.update(
+    {
+        "HH_CACHE_ENABLED": "1",
+        "HH_CACHE_TTL_SEC": "0",
+        "HH_CACHE_PATH": os.path.join(tempfile.mkdtemp(prefix="jobradar-revalidate-"), "hh_cache.sqlite"),
+        "HH_USE_PROXY": "0",
+    }
+)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+import httpx
+
+import hh_parser
+
+ETAG = '"v1"'
+CARD = {"id": "42", "key_skills": [{"name": "Python"}], "description": "<p>Описание</p>"}
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    if request.headers.get("If-None-Match") == ETAG:
+        return httpx.Response(304)
+    return httpx.Response(200, json=CARD, headers={"ETag": ETAG})
+
+
+async def main() -> None:
+    statuses = []
+
+    def record(request: httpx.Request) -> httpx.Response:
+        response = handler(request)
+        statuses.append(response.status_code)
+        return response
+
+    sem = asyncio.Semaphore(1)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(record)) as client:
+        first = await hh_parser._fetch_detail(client, sem, "42")
+        second = await hh_parser._fetch_detail(client, sem, "42")
+        item = {"id": "42"}
+        await hh_parser._fetch_key_skills(client, sem, item)
+    print(f"statuses={statuses} key_skills={item['key_skills']!r}")
+    assert statuses == [200, 304, 304], statuses
+    assert first == second == CARD, second
+    assert item["key_skills"] == "Python"
+    print("ok")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
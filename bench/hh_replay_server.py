@@ -0,0 +1,325 @@
+"""
+Локальная замена api.hh.ru для бенчмарков и регрессионных прогонов ETL.
+
+Отдаёт /vacancies (поиск с page/per_page/area/date_from/date_to/professional_role/order_by
+и лимитом глубины), /vacancies/{id} (карточка, archived=true или 404),
+/professional_roles и /proxy-list (HTML-таблица в формате free-proxy-list).
+Вакансии берутся из записанных фикстур (каталог с <id>.json, см. record())
+или генерируются синтетически. Задержка, доля 5xx/429 и доля архивных/удалённых
+вакансий настраиваются.
+
+Запуск: python bench/hh_replay_server.py --synthetic 2000 --latency-ms 50 --port 8765
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+HH_DATE_FMT = "%Y-%m-%dT%H:%M:%S%z"
+
+ROLES = [("10", "Аналитик"), ("165", "Дата-сайентист"), ("96", "Программист, разработчик")]
+AREAS = [("1", "Москва"), ("2", "Санкт-Петербург"), ("3", "Екатеринбург")]
+TITLES = ["Data Scientist", "ML Engineer", "Аналитик данных", "Продуктовый аналитик", "Python-разработчик"]
+
+
+@dataclass
+class ReplayConfig:
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after_sec: float = 1.0
+    depth: int = 2000
+    seed: int = 42
+
+
+@dataclass
+class ReplayStats:
+    requests: int = 0
+    by_path: Dict[str, int] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def hit(self, kind: str) -> None:
+        with self.lock:
+            self.requests += 1
+            self.by_path[kind] = self.by_path.get(kind, 0) + 1
+
+
+def synthetic_vacancy(i: int, rnd: random.Random, now: datetime) -> Dict:
+    role_id, role_name = rnd.choice(ROLES)
+    area_id, area_name = rnd.choice(AREAS)
+    vacancy_id = str(90000000 + i)
+    published = now - timedelta(seconds=rnd.randint(60, 86000))
+    skills = rnd.sample(["Python", "SQL", "PyTorch", "Pandas", "Airflow", "Docker", "Spark"], k=3)
+    paragraphs = "".join(
+        f"<p><strong>{h}:</strong></p><ul>{''.join(f'<li>{s} &mdash; опыт от {rnd.randint(1, 5)} лет</li>' for s in skills)}</ul>"
+        for h in ("Обязанности", "Требования", "Условия")
+    )
+    return {
+        "id": vacancy_id,
+        "name": rnd.choice(TITLES),
+        "area": {"id": area_id, "name": area_name, "url": f"https://api.hh.ru/areas/{area_id}"},
+        "published_at": published.strftime(HH_DATE_FMT),
+        "url": f"https://api.hh.ru/vacancies/{vacancy_id}?host=hh.ru",
+        "alternate_url": f"https://hh.ru/vacancy/{vacancy_id}",
+        "employer": {"id": str(rnd.randint(1, 500)), "name": f"Компания {rnd.randint(1, 500)}"},
+        "experience": {"id": "between1And3", "name": "От 1 года до 3 лет"},
+        "schedule": {"id": "remote", "name": "Удаленная работа"},
+        "professional_roles": [{"id": role_id, "name": role_name}],
+        "key_skills": [{"name": s} for s in skills],
+        "description": paragraphs,
+        "archived": False,
+    }
+
+
+class ReplayData:
+    def __init__(self, vacancies: List[Dict], archived_rate: float = 0.0, missing_rate: float = 0.0, seed: int = 42):
+        rnd = random.Random(seed)
+        self.vacancies = {v["id"]: v for v in vacancies}
+        self.order = sorted(vacancies, key=lambda v: v["published_at"], reverse=True)
+        self.missing = set()
+        for v in vacancies:
+            roll = rnd.random()
+            if roll < missing_rate:
+                self.missing.add(v["id"])
+            elif roll < missing_rate + archived_rate:
+                v["archived"] = True
+
+    @classmethod
+    def synthetic(cls, n: int, archived_rate: float = 0.0, missing_rate: float = 0.0, seed: int = 42) -> "ReplayData":
+        rnd = random.Random(seed)
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        return cls([synthetic_vacancy(i, rnd, now) for i in range(n)], archived_rate, missing_rate, seed)
+
+    @classmethod
+    def from_fixtures(cls, path: str, archived_rate: float = 0.0, missing_rate: float = 0.0, seed: int = 42) -> "ReplayData":
+        vacancies = [json.loads(p.read_text(encoding="utf-8")) for p in sorted(Path(path).glob("*.json"))]
+        return cls(vacancies, archived_rate, missing_rate, seed)
+
+    def search(self, query: Dict[str, List[str]]) -> List[Dict]:
+        text = (query.get("text", [""])[0] or "").lstrip("!").lower()
+        areas = set(query.get("area", []))
+        role = query.get("professional_role", [None])[0]
+        date_from = _parse_date(query.get("date_from", [None])[0])
+        date_to = _parse_date(query.get("date_to", [None])[0])
+        period = query.get("period", [None])[0]
+        if date_from is None and period:
+            date_from = datetime.now(timezone.utc) - timedelta(days=int(period))
+        out = []
+        for v in self.order:
+            if text and text not in v["name"].lower():
+                continue
+            if areas and v["area"]["id"] not in areas:
+                continue
+            if role and role not in {r["id"] for r in v["professional_roles"]}:
+                continue
+            published = _parse_date(v["published_at"])
+            if date_from and published < date_from:
+                continue
+            if date_to and published > date_to:
+                continue
+            out.append(v)
+        if query.get("order_by", [None])[0] == "publication_time":
+            out.sort(key=lambda v: _parse_date(v["published_at"]), reverse=True)
+        return out
+
+
+def _parse_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, HH_DATE_FMT)
+    except ValueError:
+        return datetime.fromisoformat(value)
+
+
+def _summary(v: Dict) -> Dict:
+    return {k: v[k] for k in v if k not in ("description", "key_skills", "archived")}
+
+
+VACANCY_RE = re.compile(r"^/vacancies/(\w+)$")
+
+
+def make_handler(data: ReplayData, config: ReplayConfig, stats: ReplayStats):
+    rnd = random.Random(config.seed)
+    rnd_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # иначе заголовки и тело уходят разными сегментами и ловят задержку Nagle + delayed ACK
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body: bytes = b"", content_type: str = "application/json", headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _json(self, status: int, payload) -> None:
+            self._send(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            with rnd_lock:
+                delay = config.latency_ms + rnd.uniform(0, config.latency_jitter_ms)
+                roll = rnd.random()
+            if delay:
+                time.sleep(delay / 1000)
+
+            if parsed.path == "/proxy-list":
+                stats.hit("proxy-list")
+                rows = "".join(f"<tr><td>127.0.0.{i}</td><td>{3128 + i}</td></tr>" for i in range(1, 21))
+                html = f'<table class="table table-striped table-bordered"><tr><th>IP</th><th>Port</th></tr>{rows}</table>'
+                return self._send(200, html.encode("utf-8"), "text/html; charset=utf-8")
+
+            if roll < config.throttle_rate:
+                stats.hit("429")
+                return self._send(429, b"{}", headers={"Retry-After": str(config.retry_after_sec)})
+            if roll < config.throttle_rate + config.error_rate:
+                stats.hit("5xx")
+                return self._send(503, b"{}")
+
+            if parsed.path == "/professional_roles":
+                stats.hit("professional_roles")
+                roles = [{"id": rid, "name": name} for rid, name in ROLES]
+                return self._json(200, {"categories": [{"id": "1", "name": "all", "roles": roles}]})
+
+            if parsed.path == "/vacancies":
+                stats.hit("search")
+                query = parse_qs(parsed.query)
+                page = int(query.get("page", ["0"])[0])
+                per_page = int(query.get("per_page", ["20"])[0])
+                if per_page and (page + 1) * per_page > config.depth:
+                    return self._json(400, {"errors": [{"type": "bad_argument", "value": "page"}]})
+                found = data.search(query)
+                items = [_summary(v) for v in found[page * per_page:(page + 1) * per_page]]
+                pages = -(-min(len(found), config.depth) // per_page) if per_page else 0
+                return self._json(200, {"found": len(found), "pages": pages, "page": page, "per_page": per_page, "items": items})
+
+            m = VACANCY_RE.match(parsed.path)
+            if m:
+                stats.hit("vacancy")
+                vacancy_id = m.group(1)
+                v = data.vacancies.get(vacancy_id)
+                if v is None or vacancy_id in data.missing:
+                    return self._json(404, {"errors": [{"type": "not_found"}]})
+                etag = f'"{vacancy_id}-{int(v["archived"])}"'
+                if self.headers.get("If-None-Match") == etag:
+                    return self._send(304)
+                return self._send(200, json.dumps(v, ensure_ascii=False).encode("utf-8"), headers={"ETag": etag})
+
+            stats.hit("unknown")
+            return self._json(404, {"errors": [{"type": "not_found"}]})
+
+    return Handler
+
+
+class ReplayServer:
+    """HTTP-сервер в фоновом потоке; base_url подставляется в HH_API_BASE."""
+
+    def __init__(self, data: ReplayData, config: Optional[ReplayConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or ReplayConfig()
+        self.stats = ReplayStats()
+        self.httpd = ThreadingHTTPServer((host, port), make_handler(data, self.config, self.stats))
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "ReplayServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="hh-replay", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "ReplayServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def record(search_query: str, out_dir: str, pages: int = 1, per_page: int = 50, area: int = 1) -> int:
+    """Сохраняет карточки живых вакансий hh.ru в out_dir/<id>.json для последующего воспроизведения."""
+    import httpx
+
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    saved = 0
+    with httpx.Client(timeout=20, headers={"User-Agent": "JobRadar-AI replay-recorder"}) as hc:
+        for page in range(pages):
+            r = hc.get("https://api.hh.ru/vacancies", params={"text": search_query, "page": page, "per_page": per_page, "area": area})
+            r.raise_for_status()
+            for item in r.json().get("items", []):
+                detail = hc.get(f"https://api.hh.ru/vacancies/{item['id']}")
+                if detail.status_code != 200:
+                    continue
+                Path(out_dir, f"{item['id']}.json").write_text(detail.text, encoding="utf-8")
+                saved += 1
+                time.sleep(0.3)
+    return saved
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", help="каталог с записанными карточками <id>.json")
+    parser.add_argument("--synthetic", type=int, default=1000, help="число синтетических вакансий, если нет --fixtures")
+    parser.add_argument("--record", help="записать фикстуры по поисковому запросу в --fixtures и выйти")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--archived-rate", type=float, default=0.1)
+    parser.add_argument("--missing-rate", type=float, default=0.05)
+    parser.add_argument("--depth", type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.record:
+        print(f"saved={record(args.record, args.fixtures or 'fixtures')}")
+        return
+
+    if args.fixtures:
+        data = ReplayData.from_fixtures(args.fixtures, args.archived_rate, args.missing_rate)
+    else:
+        data = ReplayData.synthetic(args.synthetic, args.archived_rate, args.missing_rate)
+    config = ReplayConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        depth=args.depth,
+    )
+    server = ReplayServer(data, config, args.host, args.port)
+    print(f"hh replay server: {server.base_url} ({len(data.vacancies)} vacancies)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(f"requests={server.stats.requests} {server.stats.by_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,8 @@ NO_PROXY =  Variable.get("NO_PROXY")
 APP_AIRFLOW_PATH = Variable.get("APP_AIRFLOW_PATH")
 SAVE_VACANCIES_AIRFLOW_PATH = Variable.get("SAVE_VACANCIES_AIRFLOW_PATH")
 EMBED_MODEL = Variable.get("EMBED_MODEL")
+# общий для парсера и uploader том: водяные знаки и индекс залитых ID
+INGEST_STATE_DIR = Variable.get("INGEST_STATE_DIR")
 SCHEDULE = "0 6 * * *"
 
 default_args = {
@@ -36,6 +38,9 @@ with dag:
         bash_command=f"python {APP_AIRFLOW_PATH}hh_parser.py",
         env={
             "SAVE_VACANCIES_AIRFLOW_PATH" : SAVE_VACANCIES_AIRFLOW_PATH,
+            "HH_INCREMENTAL": "1",
+            "INGEST_STATE_DIR": INGEST_STATE_DIR,
+            "HH_STREAMING": "1",
         },
     )
 
@@ -48,6 +53,8 @@ with dag:
             "QDRANT_URL": QDRANT_URL,
             "QDRANT_COLLECTION": QDRANT_COLLECTION,
             "EMBED_MODEL" : EMBED_MODEL,
+            "HH_INCREMENTAL": "1",
+            "INGEST_STATE_DIR": INGEST_STATE_DIR,
         },
     )
 
@@ -10,6 +10,8 @@ NO_PROXY =  Variable.get("NO_PROXY")
 APP_AIRFLOW_PATH = Variable.get("APP_AIRFLOW_PATH")
 SAVE_VACANCIES_AIRFLOW_PATH = Variable.get("SAVE_VACANCIES_AIRFLOW_PATH")
 EMBED_MODEL = Variable.get("EMBED_MODEL")
+# общий том: перезапуск задачи на другом воркере продолжает обход с контрольной точки
+SCROLL_CHECKPOINT_DIR = Variable.get("SCROLL_CHECKPOINT_DIR")
 SCHEDULE = "0 8 * * *"
 
 default_args = {
@@ -37,6 +39,7 @@ with dag:
             "SAVE_VACANCIES_AIRFLOW_PATH" : SAVE_VACANCIES_AIRFLOW_PATH,
             "QDRANT_URL": QDRANT_URL,
             "QDRANT_COLLECTION": QDRANT_COLLECTION,
+            "SCROLL_CHECKPOINT_DIR": SCROLL_CHECKPOINT_DIR,
         },
     )
 